@@ -4,9 +4,12 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from typing import Annotated
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_STATELESS
 from .dependencies import get_user_crud
+from .cache import principal_cache
+from .revocation import revocation_list
 from app.modules.users.crud import UserCrud
+from app.modules.users.models import User
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token")
@@ -14,11 +17,12 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token")
 
 def create_access_token(data: dict):
     """
-    Создаёт JWT с payload (sub, role, id, exp).
+    Создаёт JWT с payload (sub, role, id, is_active, iat, exp).
     """
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"iat": now, "exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -27,7 +31,8 @@ async def get_current_user(
         token: Annotated[str, Depends(oauth2_scheme)]
 ):
     """
-    Проверяет JWT и возвращает пользователя из базы.
+    Проверяет JWT и возвращает пользователя из кеша или из базы.
+    В режиме AUTH_STATELESS пользователь строится из claims токена без обращения к базе.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,6 +42,7 @@ async def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id: int | None = payload.get("id")
         if email is None:
             raise credentials_exception
     except jwt.ExpiredSignatureError:
@@ -48,7 +54,23 @@ async def get_current_user(
     except jwt.PyJWTError:
         raise credentials_exception
 
+    if AUTH_STATELESS and user_id is not None and "is_active" in payload:
+        if payload["is_active"] is not True or revocation_list.is_revoked(user_id, payload.get("iat")):
+            raise credentials_exception
+        return User(id=user_id, email=email, is_active=True)
+
+    if user_id is not None:
+        cached_user = principal_cache.get(user_id)
+        # Отзыв проверяется и при попадании: пользователь мог быть удален в другом процессе
+        if (
+                cached_user is not None and cached_user.email == email
+                and not revocation_list.is_revoked(user_id, payload.get("iat"))
+        ):
+            return cached_user
+
     user = await user_crud.check_user_email(email)
     if not user or user.is_active is False:
         raise credentials_exception
+    if user_id is not None and user.id == user_id:
+        principal_cache.set(user.id, user)
     return user
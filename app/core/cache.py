@@ -0,0 +1,138 @@
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Protocol
+
+from .config import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+
+
+class TTLCache:
+    '''
+    Ограниченный по количеству записей LRU-кеш с временем жизни записей.
+    Считает попадания и промахи, а при переданном sizeof — занимаемую память;
+    maxbytes дополнительно ограничивает суммарный размер записей (размер считается один раз при записи)
+    '''
+
+    def __init__(
+            self, maxsize: int, ttl: float, sizeof: Callable[[Any], int] | None = None, maxbytes: int | None = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        '''
+        Возвращает значение по ключу, если запись есть и не устарела
+        '''
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value, _ = item
+        if expires_at < time.monotonic():
+            self.invalidate(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        '''
+        Сохраняет значение, вытесняя самые давно использованные записи при переполнении.
+        Значение больше maxbytes не сохраняется
+        '''
+        self.invalidate(key)
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def invalidate(self, key: Hashable) -> None:
+        '''
+        Удаляет запись по ключу
+        '''
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def clear(self) -> None:
+        '''
+        Очищает кеш и сбрасывает счетчики
+        '''
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        '''
+        Возвращает счетчики попаданий и промахов
+        '''
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "bytes": self.bytes}
+
+
+class CacheBackend(Protocol):
+    '''
+    Интерфейс хранилища кеша. Методы асинхронные, чтобы можно было подключить общий кеш (например, Redis)
+    '''
+
+    async def get(self, key: Hashable) -> Any: ...
+
+    async def set(self, key: Hashable, value: Any) -> None: ...
+
+    async def delete(self, key: Hashable) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryCacheBackend:
+    '''
+    Хранилище кеша в памяти процесса на основе TTLCache.
+    Значения хранятся сериализованными (pickle): объем памяти ограничен maxbytes по точному размеру данных,
+    а изменение полученного из кеша значения не портит запись.
+    Значения больше max_entry_bytes (по умолчанию 1/8 maxbytes) не кешируются, чтобы несколько больших
+    страниц не вытесняли весь кеш
+    '''
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: int, max_entry_bytes: int | None = None):
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else maxbytes // 8
+        self._cache = TTLCache(maxsize, ttl, sizeof=len, maxbytes=maxbytes)
+
+    async def get(self, key: Hashable) -> Any:
+        data = self._cache.get(key)
+        return pickle.loads(data) if data is not None else None
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_entry_bytes:
+            self._cache.invalidate(key)
+            return
+        self._cache.set(key, data)
+
+    async def delete(self, key: Hashable) -> None:
+        self._cache.invalidate(key)
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+# Пользователи, прошедшие аутентификацию, по ID из токена
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
@@ -7,3 +7,68 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 ALGORITHM = os.getenv("ALGORITHM")
 TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Логирование SQL-запросов engine (отключается для нагрузочных замеров)
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "true").lower() in ("1", "true", "yes")
+
+# Кеш аутентифицированных пользователей (get_current_user)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+
+# Проверка JWT без обращения к базе (доверие к подписанным claims id/sub/is_active)
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+# Транспорт отзыва токенов между процессами (memory или postgres), по умолчанию - транспорт событий задач
+AUTH_EVENTS_BACKEND = os.getenv("AUTH_EVENTS_BACKEND", os.getenv("TASK_EVENTS_BACKEND", "memory"))
+
+# Хеширование паролей (bcrypt)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 64))
+
+# Максимальное количество задач в одном запросе POST /api/tasks/batch
+TASK_BATCH_MAX_SIZE = int(os.getenv("TASK_BATCH_MAX_SIZE", 1000))
+
+# Размер порции строк при потоковой выгрузке задач
+TASK_EXPORT_FETCH_SIZE = int(os.getenv("TASK_EXPORT_FETCH_SIZE", 500))
+
+# Импорт задач: размер порции, максимальное количество сохраняемых ошибок и размер одной записи в символах
+TASK_IMPORT_CHUNK_SIZE = int(os.getenv("TASK_IMPORT_CHUNK_SIZE", 1000))
+TASK_IMPORT_MAX_ERRORS = int(os.getenv("TASK_IMPORT_MAX_ERRORS", 100))
+TASK_IMPORT_MAX_RECORD_SIZE = int(os.getenv("TASK_IMPORT_MAX_RECORD_SIZE", 1024 * 1024))
+
+# Кеш чтения задач (количество записей, время жизни в секундах и объем сериализованных данных в байтах)
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", 10000))
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", 30))
+TASK_CACHE_MAX_BYTES = int(os.getenv("TASK_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# События об изменении задач: транспорт (memory или postgres), размер очереди соединения
+# и интервал heartbeat потока событий в секундах. С memory события, кеш чтения задач и ETag
+# согласованы только внутри одного процесса: для нескольких воркеров нужен postgres
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "memory")
+TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", 100))
+TASK_EVENTS_HEARTBEAT = float(os.getenv("TASK_EVENTS_HEARTBEAT", 15))
+
+# Напоминания о сроке выполнения задач: за сколько минут до срока напоминать,
+# на сколько минут вперед загружать задачи и размер порции загрузки
+TASK_REMINDERS_ENABLED = os.getenv("TASK_REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes")
+TASK_REMINDER_LEAD_MINUTES = float(os.getenv("TASK_REMINDER_LEAD_MINUTES", 60))
+TASK_REMINDER_WINDOW_MINUTES = float(os.getenv("TASK_REMINDER_WINDOW_MINUTES", 360))
+TASK_REMINDER_BATCH_SIZE = int(os.getenv("TASK_REMINDER_BATCH_SIZE", 500))
+# Напоминания отправляет один процесс (advisory-блокировка PostgreSQL); остальные раз в столько секунд
+# пытаются стать ведущим. Чтобы лидер видел изменения задач всех процессов, нужен TASK_EVENTS_BACKEND=postgres
+TASK_REMINDER_LEADER_RETRY = float(os.getenv("TASK_REMINDER_LEADER_RETRY", 30))
+
+# Размер порции задач при фоновом каскадном удалении и восстановлении пользователя
+USER_CASCADE_CHUNK_SIZE = int(os.getenv("USER_CASCADE_CHUNK_SIZE", 1000))
+# Задание без heartbeat дольше этого времени (в секундах) считается брошенным и может быть захвачено
+# другим процессом; с тем же интервалом проверяются незавершенные задания. Количество попыток ограничено
+USER_JOB_STALE_SECONDS = float(os.getenv("USER_JOB_STALE_SECONDS", 120))
+USER_JOB_MAX_ATTEMPTS = int(os.getenv("USER_JOB_MAX_ATTEMPTS", 3))
+
+# Архивация удаленных задач: срок хранения в tasks, размер порции, пауза между порциями
+# в секундах и интервал фонового запуска в минутах
+TASK_ARCHIVE_ENABLED = os.getenv("TASK_ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+TASK_ARCHIVE_RETENTION_DAYS = float(os.getenv("TASK_ARCHIVE_RETENTION_DAYS", 30))
+TASK_ARCHIVE_BATCH_SIZE = int(os.getenv("TASK_ARCHIVE_BATCH_SIZE", 500))
+TASK_ARCHIVE_BATCH_DELAY = float(os.getenv("TASK_ARCHIVE_BATCH_DELAY", 0.5))
+TASK_ARCHIVE_INTERVAL_MINUTES = float(os.getenv("TASK_ARCHIVE_INTERVAL_MINUTES", 60))
@@ -1,9 +1,12 @@
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
-from .config import DATABASE_URL
+from .config import DATABASE_URL, DATABASE_ECHO
+from .metrics import instrument_engine
 
 
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+async_engine = create_async_engine(DATABASE_URL, echo=DATABASE_ECHO)
+instrument_engine(async_engine, "app")
 
 async_session_maker = async_sessionmaker(
     bind=async_engine,
@@ -14,3 +17,10 @@ async_session_maker = async_sessionmaker(
 
 class Base(DeclarativeBase):
     pass
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    '''
+    DSN для прямого соединения asyncpg (без указания драйвера SQLAlchemy)
+    '''
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
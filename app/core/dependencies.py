@@ -1,4 +1,4 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from typing import AsyncGenerator, Annotated
 from fastapi import Depends
 
@@ -15,6 +15,13 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
         yield async_session
 
 
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    '''
+    Возвращает фабрику сессий для фоновых задач, которые выполняются после закрытия сессии запроса.
+    '''
+    return async_session_maker
+
+
 def get_user_crud(db: Annotated[UserCrud, Depends(get_async_db)]) -> UserCrud:
     '''
     Возвращает экземпляр UserCrud-класса для работы с пользователями.
@@ -0,0 +1,358 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Callable, Hashable, Protocol
+
+from .database import asyncpg_dsn
+from .config import DATABASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+Dispatch = Callable[[Hashable, dict[str, Any]], None]
+Reset = Callable[[], None]
+
+# Событие, которое получают обработчики всех каналов, когда часть событий могла быть потеряна
+RESYNC_EVENT = {"type": "resync"}
+# PostgreSQL отклоняет NOTIFY с полезной нагрузкой от 8000 байт
+NOTIFY_PAYLOAD_LIMIT = 8000
+
+
+class Subscription:
+    '''
+    Подписка одного соединения на события канала.
+    Очередь ограничена: если клиент не успевает забирать события, подписка помечается
+    переполненной, накопленные события отбрасываются, и клиент должен пересинхронизироваться
+    '''
+
+    def __init__(self, key: Hashable, queue_size: int):
+        self.key = key
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def push(self, event: dict[str, Any]) -> bool:
+        '''
+        Добавляет событие в очередь без ожидания. Возвращает False, если подписка переполнена
+        '''
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.invalidate()
+            return False
+        return True
+
+    def invalidate(self) -> None:
+        '''
+        Помечает подписку требующей пересинхронизации и отбрасывает накопленные события
+        '''
+        self.overflowed = True
+        # Освобождаем память сразу, не дожидаясь закрытия соединения
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        '''
+        Ожидает следующее событие. Возвращает None по истечении timeout
+        '''
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBackend(Protocol):
+    '''
+    Транспорт событий между процессами. Доставка подписчикам выполняется через dispatch хаба,
+    reset вызывается, когда транспорт мог потерять события (например, при переподключении)
+    '''
+
+    def attach(self, dispatch: Dispatch, reset: Reset) -> None:
+        ...
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+    async def publish(self, key: Hashable, event: dict[str, Any]) -> None:
+        ...
+
+
+class MemoryEventBackend:
+    '''
+    Доставка событий внутри одного процесса
+    '''
+
+    def __init__(self):
+        self.dispatch: Dispatch | None = None
+
+    def attach(self, dispatch: Dispatch, reset: Reset) -> None:
+        self.dispatch = dispatch
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, key: Hashable, event: dict[str, Any]) -> None:
+        self.dispatch(key, event)
+
+
+def notify_payloads(key: Hashable, event: dict[str, Any], limit: int = NOTIFY_PAYLOAD_LIMIT) -> list[str]:
+    '''
+    Кодирует событие в полезные нагрузки NOTIFY короче limit байт.
+    Слишком длинный список task_ids делится пополам до тех пор, пока части не уместятся.
+    Если событие не помещается и без ID, отправляется событие с пустым task_ids:
+    получатели в этом случае перечитывают задачи пользователя сами
+    '''
+    payload = json.dumps({"key": key, "event": event}, separators=(",", ":"))
+    if len(payload.encode()) < limit:
+        return [payload]
+    task_ids = event.get("task_ids") or []
+    if len(task_ids) > 1:
+        middle = len(task_ids) // 2
+        return (
+            notify_payloads(key, dict(event, task_ids=task_ids[:middle]), limit)
+            + notify_payloads(key, dict(event, task_ids=task_ids[middle:]), limit)
+        )
+    logger.warning("Событие канала %r не помещается в NOTIFY, отправляется без ID задач", key)
+    return [json.dumps({"key": key, "event": {"type": event.get("type"), "task_ids": []}}, separators=(",", ":"))]
+
+
+class PostgresEventBackend:
+    '''
+    Доставка событий между процессами через LISTEN/NOTIFY PostgreSQL.
+    Каждый процесс слушает канал отдельным соединением и раздает полученные события своим подписчикам,
+    в том числе события, опубликованные им самим.
+    Соединение слушателя проверяется фоновой задачей и переподключается с экспоненциальной задержкой;
+    после переподключения хаб сбрасывается (reset), так как уведомления за время разрыва потеряны.
+    Соединение публикации переподключается при следующей публикации
+    '''
+
+    def __init__(
+            self, database_url: str, channel: str,
+            health_interval: float = 30, reconnect_delay: float = 0.5, max_reconnect_delay: float = 30
+    ):
+        self.dsn = asyncpg_dsn(database_url)
+        self.channel = channel
+        self.health_interval = health_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.dispatch: Dispatch | None = None
+        self.reset: Reset | None = None
+        self.listener = None
+        self.publisher = None
+        self.publish_lock = asyncio.Lock()
+        self.listener_lost = asyncio.Event()
+        self.watcher: asyncio.Task | None = None
+        self.reconnects = 0
+
+    def attach(self, dispatch: Dispatch, reset: Reset) -> None:
+        self.dispatch = dispatch
+        self.reset = reset
+
+    async def start(self) -> None:
+        await self._connect_listener()
+        self.publisher = await self._connect()
+        self.watcher = asyncio.create_task(self._watch_listener())
+
+    async def stop(self) -> None:
+        if self.watcher is not None:
+            self.watcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.watcher
+            self.watcher = None
+        for connection in (self.listener, self.publisher):
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        self.listener = self.publisher = None
+
+    async def publish(self, key: Hashable, event: dict[str, Any]) -> None:
+        async with self.publish_lock:
+            for payload in notify_payloads(key, event):
+                await self._notify(payload)
+
+    async def _notify(self, payload: str) -> None:
+        import asyncpg
+
+        for attempt in range(2):
+            if self.publisher is None or self.publisher.is_closed():
+                self.publisher = await self._connect()
+            try:
+                await self.publisher.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+                return
+            except (OSError, asyncpg.InterfaceError, asyncpg.PostgresConnectionError):
+                # Разорванное соединение: одна повторная попытка через новое соединение
+                self.publisher.terminate()
+                self.publisher = None
+                if attempt:
+                    raise
+
+    async def _connect(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _connect_listener(self) -> None:
+        self.listener_lost.clear()
+        listener = await self._connect()
+        await listener.add_listener(self.channel, self._on_notify)
+        listener.add_termination_listener(self._on_listener_terminated)
+        self.listener = listener
+
+    def _on_listener_terminated(self, connection) -> None:
+        self.listener_lost.set()
+
+    async def _watch_listener(self) -> None:
+        '''
+        Проверяет соединение слушателя раз в health_interval (или сразу после разрыва)
+        и восстанавливает его при потере
+        '''
+        delay = self.reconnect_delay
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.listener_lost.wait(), self.health_interval)
+            if not self.listener_lost.is_set():
+                try:
+                    await asyncio.wait_for(self.listener.execute("SELECT 1"), self.health_interval)
+                    continue
+                except Exception:
+                    logger.warning("Соединение слушателя канала %s не отвечает", self.channel)
+                    self.listener.terminate()
+            while True:
+                try:
+                    await self._connect_listener()
+                    break
+                except Exception:
+                    logger.warning(
+                        "Не удалось переподключиться к каналу %s, повтор через %.1f с", self.channel, delay
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+            delay = self.reconnect_delay
+            self.reconnects += 1
+            logger.info("Соединение слушателя канала %s восстановлено", self.channel)
+            self.reset()
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Некорректное уведомление в канале %s: %r", channel, payload)
+            return
+        self.dispatch(message["key"], message["event"])
+
+
+def make_backend(name: str, channel: str) -> EventBackend:
+    '''
+    Создает транспорт событий по имени из настроек (memory или postgres) для канала channel
+    '''
+    if name == "postgres":
+        return PostgresEventBackend(DATABASE_URL, channel)
+    if name == "memory":
+        return MemoryEventBackend()
+    raise ValueError(f"Неизвестный транспорт событий: {name}")
+
+
+class EventHub:
+    '''
+    Раздача событий подписчикам внутри процесса (pub/sub по ключу канала).
+    Публикация проходит через backend, поэтому при общем транспорте события
+    получают подписчики всех процессов
+    '''
+
+    def __init__(self, backend: EventBackend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.subscribers: dict[Hashable, set[Subscription]] = {}
+        self.listeners: list[Dispatch] = []
+        self.published = 0
+        self.dropped = 0
+        backend.attach(self.dispatch, self.reset)
+
+    async def start(self) -> None:
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    @asynccontextmanager
+    async def subscribe(self, key: Hashable) -> AsyncIterator[Subscription]:
+        '''
+        Подписывает соединение на события канала на время контекста
+        '''
+        subscription = Subscription(key, self.queue_size)
+        self.subscribers.setdefault(key, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self.subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[key]
+
+    def add_listener(self, listener: Dispatch) -> None:
+        '''
+        Добавляет обработчик, получающий события всех каналов (для фоновых служб процесса).
+        Обработчик вызывается синхронно и не должен блокировать цикл событий
+        '''
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: Dispatch) -> None:
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    async def publish(self, key: Hashable, event: dict[str, Any]) -> None:
+        '''
+        Публикует событие в канал. Ошибки транспорта не прерывают операцию, вызвавшую публикацию
+        '''
+        self.published += 1
+        try:
+            await self.backend.publish(key, event)
+        except Exception:
+            logger.exception("Не удалось опубликовать событие в канал %r", key)
+
+    def dispatch(self, key: Hashable, event: dict[str, Any]) -> None:
+        '''
+        Раздает событие локальным подписчикам канала и обработчикам всех каналов
+        '''
+        for listener in tuple(self.listeners):
+            try:
+                listener(key, event)
+            except Exception:
+                logger.exception("Ошибка обработчика событий канала %r", key)
+        for subscription in tuple(self.subscribers.get(key, ())):
+            if not subscription.push(event):
+                self.dropped += 1
+
+    def reset(self) -> None:
+        '''
+        Сообщает, что события могли быть потеряны: все подписки требуют пересинхронизации,
+        обработчики всех каналов получают RESYNC_EVENT с ключом None
+        '''
+        for subscriptions in tuple(self.subscribers.values()):
+            for subscription in tuple(subscriptions):
+                subscription.invalidate()
+        for listener in tuple(self.listeners):
+            try:
+                listener(None, dict(RESYNC_EVENT))
+            except Exception:
+                logger.exception("Ошибка обработчика событий при пересинхронизации")
+
+    def stats(self) -> dict[str, int]:
+        '''
+        Возвращает метрики хаба: каналы, подписки, опубликованные и отброшенные события
+        '''
+        return {
+            "channels": len(self.subscribers),
+            "subscriptions": sum(len(subscribers) for subscribers in self.subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
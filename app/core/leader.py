@@ -0,0 +1,86 @@
+import logging
+from typing import Protocol
+
+from sqlalchemy.engine import make_url
+
+from .database import asyncpg_dsn
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock(Protocol):
+    '''
+    Блокировка, гарантирующая, что фоновая служба работает только в одном процессе
+    '''
+
+    async def acquire(self) -> bool:
+        ...
+
+    async def release(self) -> None:
+        ...
+
+
+class LocalLeaderLock:
+    '''
+    Лидерство без координации (один процесс: SQLite, тесты)
+    '''
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+class PostgresAdvisoryLock:
+    '''
+    Лидерство через сессионную advisory-блокировку PostgreSQL.
+    Блокировка удерживается отдельным соединением и освобождается сервером, если процесс
+    или соединение пропали, после чего ее захватывает другой процесс.
+    acquire можно вызывать повторно: у лидера он проверяет, что соединение живо
+    '''
+
+    def __init__(self, database_url: str, lock_id: int, timeout: float = 10):
+        self.dsn = asyncpg_dsn(database_url)
+        self.lock_id = lock_id
+        self.timeout = timeout
+        self.connection = None
+        self.held = False
+
+    async def acquire(self) -> bool:
+        import asyncpg
+
+        if self.connection is not None and not self.connection.is_closed():
+            try:
+                if self.held:
+                    await self.connection.fetchval("SELECT 1", timeout=self.timeout)
+                    return True
+                self.held = await self.connection.fetchval(
+                    "SELECT pg_try_advisory_lock($1)", self.lock_id, timeout=self.timeout
+                )
+                return self.held
+            except Exception:
+                logger.warning("Соединение блокировки %s потеряно", self.lock_id)
+                self.connection.terminate()
+        self.connection = None
+        self.held = False
+        self.connection = await asyncpg.connect(self.dsn, timeout=self.timeout)
+        self.held = await self.connection.fetchval("SELECT pg_try_advisory_lock($1)", self.lock_id)
+        return self.held
+
+    async def release(self) -> None:
+        # Закрытие соединения снимает все его сессионные блокировки
+        if self.connection is not None and not self.connection.is_closed():
+            await self.connection.close()
+        self.connection = None
+        self.held = False
+
+
+def make_leader_lock(database_url: str, lock_id: int) -> LeaderLock:
+    '''
+    Advisory-блокировка для PostgreSQL, для остальных СУБД - локальная (один процесс)
+    '''
+    if make_url(database_url).get_backend_name() == "postgresql":
+        return PostgresAdvisoryLock(database_url, lock_id)
+    return LocalLeaderLock()
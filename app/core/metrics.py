@@ -0,0 +1,295 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# Границы корзин гистограмм (секунды и количество запросов к базе)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def format_labels(names: tuple[str, ...], values: tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+
+
+class Histogram:
+    '''
+    Гистограмма с фиксированными корзинами: наблюдение стоит один бинарный поиск и два сложения
+    '''
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [счетчики корзин (без накопления, последняя - +Inf), сумма]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = format_labels(self.labels, labels, f'le="{format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}"
+
+
+class Gauge:
+    '''
+    Значение вычисляется функцией в момент сбора метрик.
+    Ряды с метками (например, по engine) добавляются и заменяются через track
+    '''
+
+    def __init__(
+            self, name: str, documentation: str,
+            collect: Callable[[], float] | None = None, labels: tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series: dict[tuple, Callable[[], float]] = {}
+        if collect is not None:
+            self.series[()] = collect
+
+    def track(self, labels: tuple, collect: Callable[[], float]) -> None:
+        self.series[labels] = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, collect in self.series.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {format_value(collect())}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        '''
+        Возвращает все метрики в текстовом формате Prometheus
+        '''
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Количество HTTP-запросов", ("method", "route", "status")
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route")
+))
+http_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Количество запросов к базе за HTTP-запрос", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+http_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Время запросов к базе за HTTP-запрос", ("method", "route")
+))
+# Метрики базы размечены именем engine (instrument_engine), чтобы engine тестов или скриптов
+# не смешивался с engine приложения и не подменял его ряды
+db_queries = registry.register(Counter("db_queries_total", "Количество запросов к базе", ("engine",)))
+db_latency = registry.register(Histogram(
+    "db_query_duration_seconds", "Время выполнения запроса к базе", ("engine",)
+))
+pool_checkout = registry.register(Histogram(
+    "db_pool_checkout_seconds", "Ожидание соединения из пула", ("engine",)
+))
+pool_in_use = registry.register(Gauge(
+    "db_pool_connections_in_use", "Соединения, выданные из пула", labels=("engine",)
+))
+pool_size = registry.register(Gauge("db_pool_size", "Размер пула соединений", labels=("engine",)))
+pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "Соединения сверх размера пула", labels=("engine",)
+))
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+    # Ответ отправлен: запросы фоновых задач (BackgroundTasks), унаследовавших контекст, не учитываются
+    closed: bool = False
+
+
+# Статистика текущего HTTP-запроса (None вне запроса, например в фоновых задачах)
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine: AsyncEngine, name: str = "app") -> None:
+    '''
+    Подключает к engine учет количества и времени запросов (в том числе для текущего HTTP-запроса),
+    времени ожидания соединения из пула и количества занятых соединений.
+    Ряды метрик размечаются меткой engine=name; повторный вызов с тем же именем заменяет ряды пулов
+    '''
+    sync_engine = engine.sync_engine
+    labels = (name,)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries.inc(labels)
+        db_latency.observe(elapsed, labels)
+        stats = request_stats.get()
+        if stats is not None and not stats.closed:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    pool = sync_engine.pool
+    # У пула нет события "перед выдачей соединения", поэтому ожидание измеряется оберткой
+    # вокруг Pool._do_get. Это внутренний метод SQLAlchemy (проверено на 2.0): если его не окажется,
+    # время ожидания не учитывается, остальные метрики продолжают работать
+    do_get = getattr(pool, "_do_get", None)
+    if do_get is not None:
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                pool_checkout.observe(time.perf_counter() - start, labels)
+
+        pool._do_get = timed_do_get
+
+    # Счетчик по событиям пула работает для любого класса пула (у StaticPool нет checkedout())
+    in_use = [0]
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use[0] += 1
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        in_use[0] -= 1
+
+    pool_in_use.track(labels, lambda: in_use[0])
+    if hasattr(pool, "overflow"):
+        pool_size.track(labels, lambda: pool.size())
+        pool_overflow.track(labels, lambda: max(pool.overflow(), 0))
+
+
+class QueryCounter:
+    '''
+    Контекстный менеджер, считающий SQL-запросы engine внутри блока (для тестов и профилирования)
+    '''
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.sync_engine
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+
+class MetricsMiddleware:
+    '''
+    ASGI-middleware: время обработки, статусы и запросы к базе по шаблону маршрута
+    (шаблон, а не фактический путь, чтобы количество рядов метрик было ограничено)
+    '''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        start = time.perf_counter()
+
+        def record() -> None:
+            '''
+            Учитывает запрос один раз: после отправки последней части тела ответа или при ошибке.
+            Фоновые задачи (BackgroundTasks) выполняются позже и в метрики запроса не входят
+            '''
+            if stats.closed:
+                return
+            stats.closed = True
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            http_requests.inc(labels + (status_code,))
+            http_latency.observe(elapsed, labels)
+            http_db_queries.observe(stats.queries, labels)
+            http_db_time.observe(stats.db_time, labels)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        token = request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+            record()
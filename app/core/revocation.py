@@ -0,0 +1,110 @@
+import time
+from typing import Any, Hashable
+
+from .config import ACCESS_TOKEN_EXPIRE_MINUTES, AUTH_EVENTS_BACKEND
+from .events import EventHub, make_backend
+from .cache import principal_cache
+
+
+class RevocationList:
+    '''
+    Набор отозванных пользователей: ID пользователя -> секунда (unix time), токены, выпущенные
+    не позже которой, считаются недействительными. iat в JWT хранится в целых секундах,
+    поэтому сравнение тоже идет в целых секундах: токен, выпущенный в секунду отзыва, отклоняется.
+    Записи старше срока жизни токена удаляются, так как такие токены уже истекли.
+    Список хранится в памяти процесса: изменения распространяются между процессами через auth_events,
+    а при запуске и пересинхронизации список загружается из базы (удаленные пользователи)
+    '''
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._revoked: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def revoke(self, user_id: int, revoked_at: float | None = None) -> None:
+        '''
+        Отзывает все токены пользователя, выпущенные не позже секунды revoked_at (по умолчанию — текущей)
+        '''
+        revoked_at = int(revoked_at if revoked_at is not None else time.time())
+        # Повторный отзыв (например, эхо собственного события) не сдвигает момент назад
+        self._revoked[user_id] = max(revoked_at, self._revoked.get(user_id, revoked_at))
+        self.prune()
+
+    def restore(self, user_id: int) -> None:
+        '''
+        Снимает отзыв с восстановленного пользователя
+        '''
+        self._revoked.pop(user_id, None)
+
+    def is_revoked(self, user_id: int, issued_at: float | None) -> bool:
+        '''
+        Проверяет, отозван ли токен пользователя, выпущенный в момент issued_at
+        '''
+        revoked_at = self._revoked.get(user_id)
+        if revoked_at is None:
+            return False
+        return issued_at is None or int(issued_at) <= revoked_at
+
+    def load(self, revoked: dict[int, float]) -> None:
+        '''
+        Заменяет список данными из базы (ID пользователя -> момент удаления)
+        '''
+        self._revoked = {user_id: int(revoked_at) for user_id, revoked_at in revoked.items()}
+        self.prune()
+
+    def on_event(self, key: Hashable, event: dict[str, Any]) -> None:
+        '''
+        Применяет событие отзыва или восстановления, опубликованное любым процессом
+        '''
+        if event["type"] == "revoke":
+            self.revoke(key, event["revoked_at"])
+        elif event["type"] == "restore":
+            self.restore(key)
+
+    def prune(self) -> None:
+        '''
+        Удаляет записи, для которых все затронутые токены уже истекли
+        '''
+        threshold = time.time() - self.ttl_seconds
+        for user_id in [uid for uid, ts in self._revoked.items() if ts < threshold]:
+            del self._revoked[user_id]
+
+    def clear(self) -> None:
+        self._revoked.clear()
+
+
+revocation_list = RevocationList(ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Каналы хаба - ID пользователей; подписки не используются, события применяет revocation_list
+auth_events = EventHub(make_backend(AUTH_EVENTS_BACKEND, "auth_events"), queue_size=1)
+auth_events.add_listener(revocation_list.on_event)
+
+
+def invalidate_principal(key: Hashable, event: dict[str, Any]) -> None:
+    '''
+    Сбрасывает кеш аутентифицированного пользователя при отзыве или восстановлении в любом процессе
+    '''
+    if event["type"] in ("revoke", "restore"):
+        principal_cache.invalidate(key)
+
+
+auth_events.add_listener(invalidate_principal)
+
+
+async def revoke_user_tokens(user_id: int) -> None:
+    '''
+    Отзывает токены пользователя в этом процессе и сообщает об отзыве остальным процессам
+    '''
+    revoked_at = int(time.time())
+    revocation_list.revoke(user_id, revoked_at)
+    await auth_events.publish(user_id, {"type": "revoke", "revoked_at": revoked_at})
+
+
+async def restore_user_tokens(user_id: int) -> None:
+    '''
+    Снимает отзыв токенов пользователя в этом процессе и в остальных процессах
+    '''
+    revocation_list.restore(user_id)
+    await auth_events.publish(user_id, {"type": "restore"})
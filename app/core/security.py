@@ -1,7 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 from passlib.context import CryptContext
 
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    '''
+    Очередь на хеширование паролей заполнена
+    '''
+
+
+class PasswordHasher:
+    '''
+    Выполняет bcrypt в отдельном пуле потоков, не блокируя цикл событий.
+    Количество ожидающих и выполняемых задач ограничено queue_size,
+    при переполнении сразу выбрасывается PasswordHasherBusy.
+    '''
+
+    def __init__(self, workers: int, queue_size: int):
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.queue_size:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            self.calls += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    def stats(self) -> dict[str, float]:
+        '''
+        Возвращает метрики: количество вызовов, отказов и время выполнения
+        '''
+        return {
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "pending": self._pending,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
 
 
 def hash_password(password: str) -> str:
@@ -16,3 +78,17 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Проверяет, соответствует ли введённый пароль сохранённому хешу.
     """
     return pwd_context.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Асинхронный вариант hash_password, выполняется в пуле password_hasher.
+    """
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Асинхронный вариант verify_password, выполняется в пуле password_hasher.
+    """
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
@@ -1,10 +1,56 @@
-from fastapi import FastAPI, status
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.modules.tasks import tasks_router
 from app.modules.users import users_router
+from app.modules.tasks.events import task_events
+from app.modules.tasks.reminders import reminder_scheduler
+from app.modules.tasks.cache import task_cache
+from app.modules.tasks.archive import archive_periodically
+from app.modules.users.jobs import resume_user_jobs_periodically
+from app.modules.users.revocations import load_revocations, reload_on_resync
+from app.core.config import TASK_REMINDERS_ENABLED, TASK_ARCHIVE_ENABLED
+from app.core.security import PasswordHasherBusy
+from app.core.metrics import MetricsMiddleware, Gauge, registry
+from app.core.revocation import auth_events
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await task_events.start()
+    auth_events.add_listener(reload_on_resync)
+    await auth_events.start()
+    await load_revocations()
+    if TASK_REMINDERS_ENABLED:
+        await reminder_scheduler.start()
+    background = [asyncio.create_task(resume_user_jobs_periodically())]
+    if TASK_ARCHIVE_ENABLED:
+        background.append(asyncio.create_task(archive_periodically()))
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await reminder_scheduler.stop()
+    await task_events.stop()
+    await auth_events.stop()
+
 
+app = FastAPI(title="Мой todo list", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
-app = FastAPI(title="Мой todo list")
+registry.register(Gauge(
+    "task_cache_hit_rate", "Доля попаданий в кеш чтения задач", lambda: task_cache.stats()["hit_rate"]
+))
+registry.register(Gauge(
+    "task_cache_bytes", "Примерный объем кеша чтения задач", lambda: task_cache.stats()["bytes"]
+))
+registry.register(Gauge(
+    "task_events_subscriptions", "Открытые потоки событий задач", lambda: task_events.stats()["subscriptions"]
+))
 
 app.include_router(tasks_router, prefix="/api/tasks", tags=["Tasks"])
 app.include_router(users_router, prefix="/api/users", tags=["Users"])
@@ -13,3 +59,20 @@ app.include_router(users_router, prefix="/api/users", tags=["Users"])
 @app.get("/", status_code=status.HTTP_200_OK)
 async def get_hello():
     return {"message": "Hello!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    '''
+    Метрики приложения в текстовом формате Prometheus
+    '''
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Сервис перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"},
+    )
@@ -0,0 +1,50 @@
+"""Add partial indexes for task hot paths
+
+Revision ID: 3c1f5a9e2b74
+Revises: 970d60f0edbb
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f5a9e2b74'
+down_revision: Union[str, Sequence[str], None] = '970d60f0edbb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_PG = "is_active IS true"
+ACTIVE_SQLITE = "is_active IS 1"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_user_active_created', 'tasks', ['user_id', 'created_at', 'id'], unique=False,
+        postgresql_where=sa.text(ACTIVE_PG), sqlite_where=sa.text(ACTIVE_SQLITE)
+    )
+    op.create_index(
+        'ix_tasks_user_active_due', 'tasks', ['user_id', 'due_date', 'id'], unique=False,
+        postgresql_where=sa.text(ACTIVE_PG), sqlite_where=sa.text(ACTIVE_SQLITE)
+    )
+    op.create_index(
+        'ix_tasks_user_active_status', 'tasks', ['user_id', 'status', 'created_at', 'id'], unique=False,
+        postgresql_where=sa.text(ACTIVE_PG), sqlite_where=sa.text(ACTIVE_SQLITE)
+    )
+    op.create_index(
+        'ix_tasks_active_due_date', 'tasks', ['due_date'], unique=False,
+        postgresql_where=sa.text(f"{ACTIVE_PG} AND due_date IS NOT NULL"),
+        sqlite_where=sa.text(f"{ACTIVE_SQLITE} AND due_date IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_active_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_user_active_status', table_name='tasks')
+    op.drop_index('ix_tasks_user_active_due', table_name='tasks')
+    op.drop_index('ix_tasks_user_active_created', table_name='tasks')
@@ -0,0 +1,31 @@
+"""Add index for the task change feed
+
+Revision ID: 5f7a2c9d4e13
+Revises: 8d2e4b7c1a90
+Create Date: 2026-10-18 13:21:09.512734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f7a2c9d4e13'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b7c1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_user_changed', 'tasks',
+        ['user_id', sa.text('coalesce(updated_at, created_at)'), 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_changed', table_name='tasks')
@@ -0,0 +1,51 @@
+"""Add user jobs for background task cascade
+
+Revision ID: a4b1e6c83d25
+Revises: 5f7a2c9d4e13
+Create Date: 2026-10-18 14:37:52.860417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4b1e6c83d25'
+down_revision: Union[str, Sequence[str], None] = '5f7a2c9d4e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.Enum('DEACTIVATE_TASKS', 'RESTORE_TASKS', name='userjobaction'), nullable=False),
+    sa.Column(
+        'status',
+        sa.Enum('PENDING', 'RUNNING', 'COMPLETED', 'CANCELLED', 'FAILED', name='userjobstatus'),
+        nullable=False
+    ),
+    sa.Column('since', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_task_id', sa.Integer(), nullable=False),
+    sa.Column('max_task_id', sa.Integer(), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_jobs_user_id', 'user_jobs', ['user_id'], unique=False)
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_id', table_name='tasks')
+    op.drop_index('ix_user_jobs_user_id', table_name='user_jobs')
+    op.drop_table('user_jobs')
+    sa.Enum(name='userjobstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='userjobaction').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""Keep the change number of archived tasks for the change feed
+
+Revision ID: b6e3d8a1f024
+Revises: f4b7e1c9a352
+Create Date: 2026-10-18 19:21:05.604713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e3d8a1f024'
+down_revision: Union[str, Sequence[str], None] = 'f4b7e1c9a352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Задачи, перенесенные в архив раньше, попадают в начало ленты изменений
+    op.add_column('tasks_archive', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_tasks_archive_user_change_seq', 'tasks_archive', ['user_id', 'change_seq', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_archive_user_change_seq', table_name='tasks_archive')
+    op.drop_column('tasks_archive', 'change_seq')
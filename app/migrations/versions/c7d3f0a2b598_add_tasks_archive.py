@@ -0,0 +1,55 @@
+"""Add tasks archive for expired soft-deleted tasks
+
+Revision ID: c7d3f0a2b598
+Revises: a4b1e6c83d25
+Create Date: 2026-10-18 15:48:13.204559
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d3f0a2b598'
+down_revision: Union[str, Sequence[str], None] = 'a4b1e6c83d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INACTIVE_PG = "is_active IS false"
+INACTIVE_SQLITE = "is_active IS 0"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Типы taskstatus и taskpriority уже созданы первой миграцией
+    op.create_table('tasks_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', postgresql.ENUM('PENDING', 'COMPLETED', name='taskstatus', create_type=False), nullable=False),
+    sa.Column(
+        'priority', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', name='taskpriority', create_type=False), nullable=False
+    ),
+    sa.Column('due_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tasks_archive_user_id', 'tasks_archive', ['user_id', 'id'], unique=False)
+    op.create_index(
+        'ix_tasks_inactive_changed', 'tasks', [sa.text('coalesce(updated_at, created_at)')], unique=False,
+        postgresql_where=sa.text(INACTIVE_PG), sqlite_where=sa.text(INACTIVE_SQLITE)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_inactive_changed', table_name='tasks')
+    op.drop_index('ix_tasks_archive_user_id', table_name='tasks_archive')
+    op.drop_table('tasks_archive')
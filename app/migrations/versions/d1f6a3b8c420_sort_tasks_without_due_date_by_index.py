@@ -0,0 +1,40 @@
+"""Index the due date sort key of tasks without a due date
+
+Revision ID: d1f6a3b8c420
+Revises: b6e3d8a1f024
+Create Date: 2026-10-18 19:48:12.372950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f6a3b8c420'
+down_revision: Union[str, Sequence[str], None] = 'b6e3d8a1f024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_PG = "is_active IS true"
+ACTIVE_SQLITE = "is_active IS 1"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сортировка по сроку начинается с признака "срок не указан": он добавлен в индекс
+    op.drop_index('ix_tasks_user_active_due', table_name='tasks')
+    op.create_index(
+        'ix_tasks_user_active_due', 'tasks', ['user_id', sa.text('(due_date IS NULL)'), 'due_date', 'id'],
+        unique=False, postgresql_where=sa.text(ACTIVE_PG), sqlite_where=sa.text(ACTIVE_SQLITE)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_user_active_due', table_name='tasks')
+    op.create_index(
+        'ix_tasks_user_active_due', 'tasks', ['user_id', 'due_date', 'id'], unique=False,
+        postgresql_where=sa.text(ACTIVE_PG), sqlite_where=sa.text(ACTIVE_SQLITE)
+    )
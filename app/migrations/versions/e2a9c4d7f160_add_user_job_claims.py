@@ -0,0 +1,32 @@
+"""Add owner, heartbeat and attempts to user jobs
+
+Revision ID: e2a9c4d7f160
+Revises: c7d3f0a2b598
+Create Date: 2026-10-18 18:02:41.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4d7f160'
+down_revision: Union[str, Sequence[str], None] = 'c7d3f0a2b598'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_jobs', sa.Column('owner', sa.String(length=64), nullable=True))
+    op.add_column('user_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('user_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_jobs', 'attempts')
+    op.drop_column('user_jobs', 'heartbeat_at')
+    op.drop_column('user_jobs', 'owner')
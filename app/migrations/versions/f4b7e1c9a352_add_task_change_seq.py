@@ -0,0 +1,57 @@
+"""Replace the time-based task change feed key with a per-user change counter
+
+Revision ID: f4b7e1c9a352
+Revises: e2a9c4d7f160
+Create Date: 2026-10-18 18:40:27.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b7e1c9a352'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c4d7f160'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('task_change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    # Существующие задачи нумеруются в прежнем порядке ленты изменений
+    op.execute(
+        """
+        UPDATE tasks SET change_seq = numbered.seq
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id ORDER BY coalesce(updated_at, created_at), id
+            ) AS seq
+            FROM tasks
+        ) AS numbered
+        WHERE tasks.id = numbered.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE users SET task_change_seq = coalesce(
+            (SELECT max(tasks.change_seq) FROM tasks WHERE tasks.user_id = users.id), 0
+        )
+        """
+    )
+    op.create_index('ix_tasks_user_change_seq', 'tasks', ['user_id', 'change_seq', 'id'], unique=False)
+    op.drop_index('ix_tasks_user_changed', table_name='tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_tasks_user_changed', 'tasks',
+        ['user_id', sa.text('coalesce(updated_at, created_at)'), 'id'], unique=False
+    )
+    op.drop_index('ix_tasks_user_change_seq', table_name='tasks')
+    op.drop_column('tasks', 'change_seq')
+    op.drop_column('users', 'task_change_seq')
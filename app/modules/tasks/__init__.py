@@ -1,5 +1,5 @@
 from .routers import tasks_router
-from .models import Task
+from .models import Task, TaskArchive
 from .schemas import TaskIn, TaskOut
 
 
@@ -9,6 +9,7 @@ __all__ = [
 
     # models
     "Task",
+    "TaskArchive",
 
     # schemas
     "TaskIn",
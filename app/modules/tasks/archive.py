@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+from typing import Callable
+
+from .crud import TaskCrud
+from app.core.config import (
+    TASK_ARCHIVE_RETENTION_DAYS, TASK_ARCHIVE_BATCH_SIZE, TASK_ARCHIVE_BATCH_DELAY, TASK_ARCHIVE_INTERVAL_MINUTES
+)
+from app.core.database import async_session_maker
+
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_tasks(
+        task_crud: TaskCrud,
+        retention: timedelta = timedelta(days=TASK_ARCHIVE_RETENTION_DAYS),
+        batch_size: int = TASK_ARCHIVE_BATCH_SIZE,
+        delay: float = TASK_ARCHIVE_BATCH_DELAY,
+        max_batches: int | None = None,
+        progress: Callable[[int], None] | None = None
+) -> int:
+    '''
+    Переносит в архив задачи, удаленные раньше срока хранения retention, порциями по batch_size.
+    Между порциями выдерживается пауза delay, чтобы не нагружать базу. max_batches ограничивает
+    количество порций за один запуск. Возвращает количество перенесенных задач
+    '''
+    older_than = datetime.now() - retention
+    archived = 0
+    batches = 0
+    while True:
+        batch = await task_crud.archive_inactive_tasks(older_than, batch_size)
+        archived += batch
+        batches += 1
+        if progress is not None:
+            progress(archived)
+        if batch < batch_size or (max_batches is not None and batches >= max_batches):
+            return archived
+        await asyncio.sleep(delay)
+
+
+async def archive_periodically(interval: timedelta = timedelta(minutes=TASK_ARCHIVE_INTERVAL_MINUTES)) -> None:
+    '''
+    Фоновая архивация (запускается из lifespan приложения)
+    '''
+    while True:
+        try:
+            async with async_session_maker() as session:
+                archived = await archive_tasks(TaskCrud(session))
+            if archived:
+                logger.info("Перенесено в архив задач: %s", archived)
+        except Exception:
+            logger.exception("Ошибка архивации задач")
+        await asyncio.sleep(interval.total_seconds())
+
+
+async def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Перенос удаленных задач в архив")
+    parser.add_argument("--retention-days", type=float, default=TASK_ARCHIVE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=TASK_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--delay", type=float, default=TASK_ARCHIVE_BATCH_DELAY)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    def print_progress(archived: int) -> None:
+        print(f"перенесено: {archived}", file=sys.stderr)
+
+    async with async_session_maker() as session:
+        archived = await archive_tasks(
+            TaskCrud(session), timedelta(days=args.retention_days),
+            args.batch_size, args.delay, args.max_batches, print_progress
+        )
+    print(archived)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Hashable
+
+from .enums import TaskEventType
+from app.core.cache import CacheBackend, MemoryCacheBackend
+from app.core.config import TASK_CACHE_SIZE, TASK_CACHE_TTL, TASK_CACHE_MAX_BYTES
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskReadCache:
+    '''
+    Кеш чтения задач с инвалидацией по пользователю.
+    Ключи списков включают "поколение" пользователя: при любом изменении его задач
+    поколение заменяется новым, и все прежние записи становятся недостижимыми.
+    Записи отдельных задач хранят поколение владельца и проверяют его при чтении
+    '''
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # Количество инвалидаций: владелец задачи известен только после загрузки, поэтому строка
+        # не сохраняется, если во время загрузки задачи какого-либо пользователя изменились
+        self.invalidations = 0
+        # Фоновые инвалидации по событиям (ссылки хранятся, чтобы задачи не собрал сборщик мусора)
+        self._pending: set[asyncio.Task] = set()
+
+    async def _generation(self, user_id: int) -> str:
+        key = ("generation", user_id)
+        generation = await self.backend.get(key)
+        if generation is None:
+            # Поколение могло быть вытеснено: новое значение отсекает все старые записи
+            generation = uuid.uuid4().hex
+            await self.backend.set(key, generation)
+        return generation
+
+    async def get_user_value(
+            self, user_id: int, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        '''
+        Возвращает значение, зависящее от задач пользователя, загружая его через load при промахе
+        '''
+        cache_key = ("user", user_id, await self._generation(user_id), key)
+        value = await self.backend.get(cache_key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await load()
+        await self.backend.set(cache_key, value)
+        return value
+
+    async def get_task_value(
+            self, task_id: int, key: Hashable, load: Callable[[], Awaitable[dict | None]]
+    ) -> dict | None:
+        '''
+        Возвращает строку задачи (с полем user_id), загружая ее через load при промахе
+        '''
+        cache_key = ("task", task_id, key)
+        cached = await self.backend.get(cache_key)
+        if cached is not None:
+            owner_id, generation, row = cached
+            if generation == await self._generation(owner_id):
+                self.hits += 1
+                return row
+        self.misses += 1
+        invalidations = self.invalidations
+        row = await load()
+        if row is not None:
+            generation = await self._generation(row["user_id"])
+            # Строка могла быть прочитана до изменения, зафиксированного во время загрузки
+            if self.invalidations == invalidations:
+                await self.backend.set(cache_key, (row["user_id"], generation, row))
+        return row
+
+    async def invalidate_user(self, user_id: int) -> None:
+        '''
+        Сбрасывает все закешированные данные задач пользователя
+        '''
+        self.invalidations += 1
+        await self.backend.set(("generation", user_id), uuid.uuid4().hex)
+
+    def on_event(self, key: Hashable, event: dict[str, Any]) -> None:
+        '''
+        Обработчик хаба событий задач: сбрасывает кеш пользователя при изменении его задач в любом процессе
+        (ETag списков и задач строятся по кешу). При потере событий транспортом кеш очищается целиком
+        '''
+        if key is None:
+            self.invalidations += 1
+            self.backend.clear()
+            return
+        if event.get("type") == TaskEventType.REMINDER.value:
+            return
+        task = asyncio.create_task(self._invalidate_from_event(key))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _invalidate_from_event(self, user_id: int) -> None:
+        try:
+            await self.invalidate_user(user_id)
+        except Exception:
+            logger.exception("Не удалось сбросить кеш задач пользователя %s", user_id)
+
+    def stats(self) -> dict[str, float]:
+        '''
+        Возвращает метрики кеша: попадания, промахи, доля попаданий, количество записей и объем в байтах
+        '''
+        backend_stats = self.backend.stats()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": backend_stats["size"],
+            "bytes": backend_stats["bytes"],
+        }
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+task_cache = TaskReadCache(MemoryCacheBackend(TASK_CACHE_SIZE, TASK_CACHE_TTL, TASK_CACHE_MAX_BYTES))
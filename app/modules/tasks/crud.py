@@ -1,8 +1,173 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import Row, Select, select, update, insert, delete, case, func, false, union_all
+from sqlalchemy.sql.elements import ColumnElement
+from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
 
-from .models import Task
-from .schemas import TaskIn
+from .models import Task, TaskArchive
+from .enums import TaskPriority, TaskSort, TaskStatus, TaskEventType
+from .schemas import TaskIn, TaskFilter
+from .pagination import encode_cursor, decode_cursor, keyset_condition
+from .search import search_tasks_query
+from .cache import task_cache
+from .events import publish_task_event
+from app.core.config import TASK_EXPORT_FETCH_SIZE
+
+
+# Смысловой порядок приоритетов (по значению enum в базе порядок был бы алфавитным)
+PRIORITY_RANK = case(
+    (Task.priority == TaskPriority.LOW, 0),
+    (Task.priority == TaskPriority.MEDIUM, 1),
+    else_=2
+)
+# Колонки задачи для чтения без создания ORM-объектов
+TASK_COLUMNS = [
+    Task.id, Task.title, Task.description, Task.status, Task.priority, Task.due_date,
+    Task.is_active, Task.created_at, Task.updated_at, Task.user_id
+]
+TASK_FIELDS = [column.key for column in TASK_COLUMNS]
+TASK_COLUMN_BY_FIELD = {column.key: column for column in TASK_COLUMNS}
+# Момент последнего изменения задачи (создание, обновление или мягкое удаление)
+CHANGED_AT = func.coalesce(Task.updated_at, Task.created_at)
+# Монотонный ключ ленты изменений, совпадает с индексом ix_tasks_user_change_seq
+CHANGE_KEYS = [(Task.change_seq, False), (Task.id, False)]
+CHANGES_CURSOR_TAG = "changes:seq"
+# Колонки, переносимые в архив (is_active у архивных задач всегда False)
+ARCHIVE_COLUMNS = [column.key for column in TASK_COLUMNS if column.key != "is_active"] + ["change_seq"]
+# Архивные задачи в ленте изменений: те же поля, что у задач, с is_active = False
+ARCHIVE_CHANGE_COLUMNS = [
+    false().label(field) if field == "is_active" else getattr(TaskArchive, field) for field in TASK_FIELDS
+]
+ARCHIVE_CHANGE_KEYS = [(TaskArchive.change_seq, False), (TaskArchive.id, False)]
+# Истинно для задач без срока выполнения, чтобы они шли последними при любой СУБД.
+# Совпадает с выражением индекса ix_tasks_user_active_due, поэтому сортировка идет по индексу
+DUE_DATE_MISSING = Task.due_date.is_(None)
+
+
+def excludes_missing_due_date(filters: TaskFilter | None) -> bool:
+    '''
+    Проверяет, что фильтр отбирает только задачи со сроком выполнения
+    '''
+    return filters is not None and (
+        filters.due_from is not None or filters.due_to is not None or filters.overdue
+    )
+
+
+def task_sort_keys(sort: TaskSort, filters: TaskFilter | None = None) -> list[tuple[ColumnElement, bool]]:
+    '''
+    Возвращает ключ сортировки (выражение, по убыванию) для стабильной пагинации.
+    Задачи без срока выполнения всегда идут последними. Если фильтр их исключает, признак отсутствия
+    срока в ключ не входит: он постоянен, а SQLite не пропускает постоянное выражение в ORDER BY
+    и сортировал бы выборку заново
+    '''
+    descending = sort.value.startswith("-")
+    if sort in (TaskSort.DUE_DATE, TaskSort.DUE_DATE_DESC):
+        keys = [(Task.due_date, descending), (Task.id, descending)]
+        if not excludes_missing_due_date(filters):
+            keys.insert(0, (DUE_DATE_MISSING, False))
+        return keys
+    if sort in (TaskSort.PRIORITY, TaskSort.PRIORITY_DESC):
+        return [(PRIORITY_RANK, descending), (Task.created_at, descending), (Task.id, descending)]
+    return [(Task.created_at, descending), (Task.id, descending)]
+
+
+def task_filter_conditions(filters: TaskFilter | None) -> list[ColumnElement]:
+    '''
+    Возвращает условия WHERE для фильтра задач
+    '''
+    if filters is None:
+        return []
+    conditions = []
+    if filters.status:
+        conditions.append(Task.status.in_(filters.status))
+    if filters.priority:
+        conditions.append(Task.priority.in_(filters.priority))
+    if excludes_missing_due_date(filters):
+        # Задачи без срока под условия по сроку не подходят; условие через выражение индекса
+        # позволяет искать диапазон сроков по ix_tasks_user_active_due
+        conditions.append(DUE_DATE_MISSING == false())
+    if filters.due_from is not None:
+        conditions.append(Task.due_date >= filters.due_from)
+    if filters.due_to is not None:
+        conditions.append(Task.due_date <= filters.due_to)
+    if filters.overdue:
+        conditions.append(Task.due_date < datetime.now(timezone.utc))
+        conditions.append(Task.status != TaskStatus.COMPLETED)
+    return conditions
+
+
+async def allocate_change_seq(db: AsyncSession, user_id: int, task_id: int | None = None) -> int | None:
+    '''
+    Выделяет следующий номер изменения задач пользователя для записи в Task.change_seq.
+    UPDATE блокирует строку пользователя до конца транзакции, поэтому транзакции одного пользователя
+    получают номера в порядке фиксации: клиент ленты изменений, прочитавший номер N, не пропустит
+    изменение с меньшим номером, зафиксированное позже (время изменения такой гарантии не дает).
+    Если передан task_id, номер выделяется только при наличии активной задачи пользователя с этим ID,
+    иначе вернется None и строка пользователя не изменится
+    '''
+    # Локальный импорт: модуль пользователей сам зависит от CRUD задач
+    from app.modules.users.models import User
+
+    query = update(User).where(User.id == user_id)
+    if task_id is not None:
+        query = query.where(
+            select(Task.id).where(Task.id == task_id, Task.user_id == user_id, Task.is_active.is_(True)).exists()
+        )
+    return await db.scalar(
+        # updated_at пользователя хранит момент его удаления или восстановления и не должен меняться
+        query.values(task_change_seq=User.task_change_seq + 1, updated_at=User.updated_at)
+        .returning(User.task_change_seq)
+    )
+
+
+def user_tasks_page_query(
+        user_id: int, limit: int, cursor: str | None, skip: int,
+        filters: TaskFilter | None, sort: TaskSort, fields: tuple[str, ...]
+) -> Select:
+    '''
+    Строит запрос страницы активных задач пользователя: колонки fields, затем значения ключа сортировки
+    (из них строится курсор следующей страницы)
+    '''
+    keys = task_sort_keys(sort, filters)
+    query = (
+        select(*(TASK_COLUMN_BY_FIELD[field] for field in fields), *(expr for expr, _ in keys))
+        .where(Task.user_id == user_id, Task.is_active.is_(True))
+        .order_by(*(expr.desc() if descending else expr for expr, descending in keys))
+        .limit(limit)
+    )
+    query = apply_task_filter(query, filters)
+    if cursor is not None:
+        query = query.where(keyset_condition(keys, decode_cursor(cursor, keys, sort.value)))
+    elif skip:
+        query = query.offset(skip)
+    return query
+
+
+def task_changes_query(user_id: int, since: str | None, limit: int) -> Select:
+    '''
+    Строит запрос ленты изменений: задачи и архивные задачи пользователя после курсора since
+    в порядке (change_seq, id). Каждая часть читается по своему индексу (user_id, change_seq, id)
+    '''
+    tasks = select(*TASK_COLUMNS, Task.change_seq).where(Task.user_id == user_id)
+    archived = select(*ARCHIVE_CHANGE_COLUMNS, TaskArchive.change_seq).where(TaskArchive.user_id == user_id)
+    if since is not None:
+        values = decode_cursor(since, CHANGE_KEYS, CHANGES_CURSOR_TAG)
+        tasks = tasks.where(keyset_condition(CHANGE_KEYS, values))
+        archived = archived.where(keyset_condition(ARCHIVE_CHANGE_KEYS, values))
+    # Каждая часть ограничивается заранее: общая сортировка обрабатывает не больше 2 * limit строк
+    parts = [
+        select(part.order_by(*(expr for expr, _ in keys)).limit(limit).subquery())
+        for part, keys in ((tasks, CHANGE_KEYS), (archived, ARCHIVE_CHANGE_KEYS))
+    ]
+    changes = union_all(*parts).subquery()
+    return select(changes).order_by(changes.c.change_seq, changes.c.id).limit(limit)
+
+
+def apply_task_filter(query: Select, filters: TaskFilter | None) -> Select:
+    '''
+    Добавляет к запросу условия фильтра задач
+    '''
+    return query.where(*task_filter_conditions(filters))
 
 
 class TaskCrud:
@@ -19,6 +184,53 @@ class TaskCrud:
         )
         return db_task
 
+    async def get_task_row(self, task_id: int, fields: tuple[str, ...] | None = None) -> dict | None:
+        '''
+        Получает активную задачу в виде словаря только с указанными полями (проекция в SQL).
+        user_id, created_at и updated_at выбираются всегда для проверки доступа и построения ETag.
+        Результат кешируется до изменения задач владельца
+        '''
+        return await task_cache.get_task_value(task_id, fields, lambda: self._load_task_row(task_id, fields))
+
+    async def _load_task_row(self, task_id: int, fields: tuple[str, ...] | None) -> dict | None:
+        required = ("user_id", "created_at", "updated_at")
+        fields = required + tuple(field for field in fields or TASK_FIELDS if field not in required)
+        row = (await self.db.execute(
+            select(*(TASK_COLUMN_BY_FIELD[field] for field in fields))
+            .where(Task.id == task_id, Task.is_active.is_(True))
+        )).first()
+        if row is None:
+            return None
+        return dict(row._mapping)
+
+    async def get_task_owner(self, task_id: int) -> int | None:
+        '''
+        Возвращает ID владельца активной задачи, если задача не найдена, вернется None
+        '''
+        owner_id = await self.db.scalar(
+            select(Task.user_id)
+            .where(Task.id == task_id, Task.is_active.is_(True))
+        )
+        return owner_id
+
+    async def get_user_tasks_watermark(self, user_id: int) -> tuple[int, int | None, int | None]:
+        '''
+        Возвращает "водяной знак" задач пользователя: количество, максимальный ID и номер последнего изменения.
+        Учитываются и удаленные задачи, так как мягкое удаление выделяет новый номер изменения
+        '''
+        return await task_cache.get_user_value(user_id, "watermark", lambda: self._load_user_tasks_watermark(user_id))
+
+    async def _load_user_tasks_watermark(self, user_id: int) -> tuple[int, int | None, int | None]:
+        row = (await self.db.execute(
+            select(
+                func.count(Task.id),
+                func.max(Task.id),
+                func.max(Task.change_seq)
+            )
+            .where(Task.user_id == user_id)
+        )).one()
+        return tuple(row)
+
     async def get_user_tasks(self, user_id: int, skip: int = 0, limit: int = 100) -> list[Task]:
         '''
         Получает из базы данных активные задачи конкретного пользователя
@@ -26,24 +238,187 @@ class TaskCrud:
         user_tasks = await self.db.scalars(
             select(Task)
             .where(Task.user_id == user_id, Task.is_active.is_(True))
+            .order_by(Task.created_at, Task.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return user_tasks.all()
+
+    async def get_user_tasks_page(
+            self, user_id: int, limit: int = 100, cursor: str | None = None, skip: int = 0,
+            filters: TaskFilter | None = None, sort: TaskSort = TaskSort.CREATED_AT,
+            fields: tuple[str, ...] | None = None
+    ) -> tuple[list[dict], str | None]:
+        '''
+        Получает страницу активных задач пользователя с фильтрацией и стабильной сортировкой.
+        Если передан курсор, выборка начинается после него (keyset-пагинация), иначе со смещения skip.
+        fields ограничивает выбираемые колонки.
+        Возвращает задачи в виде словарей (без ORM-объектов) и курсор следующей страницы
+        (None, если страниц больше нет). Результат кешируется до изменения задач пользователя
+        '''
+        def load():
+            return self._load_user_tasks_page(user_id, limit, cursor, skip, filters, sort, fields)
+
+        # Результат overdue зависит от текущего времени, такие страницы не кешируются
+        if filters is not None and filters.overdue:
+            return await load()
+        key = ("page", limit, cursor, skip, filters.model_dump_json() if filters else None, sort.value, fields)
+        return await task_cache.get_user_value(user_id, key, load)
+
+    async def _load_user_tasks_page(
+            self, user_id: int, limit: int, cursor: str | None, skip: int,
+            filters: TaskFilter | None, sort: TaskSort, fields: tuple[str, ...] | None
+    ) -> tuple[list[dict], str | None]:
+        fields = tuple(fields or TASK_FIELDS)
+        rows = (await self.db.execute(
+            user_tasks_page_query(user_id, limit + 1, cursor, skip, filters, sort, fields)
+        )).all()
+        columns_count = len(fields)
+        user_tasks = [dict(zip(fields, row[:columns_count])) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return user_tasks, None
+        return user_tasks, encode_cursor(list(rows[limit - 1][columns_count:]), sort.value)
+
+    async def get_user_task_changes(
+            self, user_id: int, since: str | None = None, limit: int = 100
+    ) -> tuple[list[dict], str | None, bool]:
+        '''
+        Получает задачи пользователя, созданные, измененные или удаленные (is_active = False) после курсора since,
+        в порядке номера изменения (change_seq). Удаленные задачи, перенесенные в архив, возвращаются из архива.
+        Без курсора лента начинается с самой ранней задачи.
+        Возвращает задачи в виде словарей, курсор для следующего запроса и признак наличия следующей страницы
+        '''
+        return await task_cache.get_user_value(
+            user_id, ("changes", since, limit), lambda: self._load_user_task_changes(user_id, since, limit)
+        )
+
+    async def _load_user_task_changes(
+            self, user_id: int, since: str | None, limit: int
+    ) -> tuple[list[dict], str | None, bool]:
+        rows = (await self.db.execute(task_changes_query(user_id, since, limit + 1))).all()
+        changed_tasks = [dict(zip(TASK_FIELDS, row)) for row in rows[:limit]]
+        if not changed_tasks:
+            return changed_tasks, since, False
+        last = rows[len(changed_tasks) - 1]
+        return changed_tasks, encode_cursor([last[-1], last.id], CHANGES_CURSOR_TAG), len(rows) > limit
+
+    async def get_archived_tasks(self, user_id: int, skip: int = 0, limit: int = 100) -> list[TaskArchive]:
+        '''
+        Получает архивные задачи пользователя
+        '''
+        archived_tasks = await self.db.scalars(
+            select(TaskArchive)
+            .where(TaskArchive.user_id == user_id)
+            .order_by(TaskArchive.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return archived_tasks.all()
+
+    async def search_user_tasks(self, user_id: int, q: str, skip: int = 0, limit: int = 100) -> list[Task]:
+        '''
+        Полнотекстовый поиск по активным задачам пользователя, результаты отсортированы по релевантности
+        '''
+        query = search_tasks_query(self.db.get_bind().dialect.name, q)
+        if query is None:
+            return []
+        user_tasks = await self.db.scalars(
+            query
+            .where(Task.user_id == user_id, Task.is_active.is_(True))
             .offset(skip)
             .limit(limit)
         )
         return user_tasks.all()
 
+    async def stream_user_tasks(
+            self, user_id: int, include_inactive: bool = False, fetch_size: int = TASK_EXPORT_FETCH_SIZE
+    ) -> AsyncIterator[Sequence[Row]]:
+        '''
+        Построчно выгружает задачи пользователя через серверный курсор порциями по fetch_size строк.
+        Сессия закрывается по окончании выгрузки, так как генератор живет дольше запроса
+        '''
+        query = (
+            select(*TASK_COLUMNS)
+            .where(Task.user_id == user_id)
+            .order_by(Task.id)
+            .execution_options(yield_per=fetch_size)
+        )
+        if not include_inactive:
+            query = query.where(Task.is_active.is_(True))
+        try:
+            result = await self.db.stream(query)
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await self.db.close()
+
     async def create_task(self, task: TaskIn, user_id: int) -> Task:
         '''
-        Создает новую задачу в базе данных.
+        Создает новую задачу в базе данных одним запросом (INSERT ... RETURNING).
         '''
         dct_values = task.model_dump()
-        dct_values.update({"user_id": user_id})
-        new_task = Task(**dct_values)
+        dct_values.update({"user_id": user_id, "change_seq": await allocate_change_seq(self.db, user_id)})
 
-        self.db.add(new_task)
+        new_task = await self.db.scalar(
+            insert(Task)
+            .values(**dct_values)
+            .returning(Task)
+        )
         await self.db.commit()
-        await self.db.refresh(new_task)
+        await self._tasks_changed(user_id, TaskEventType.CREATED, [new_task.id])
         return new_task
 
+    async def create_tasks(self, tasks: list[TaskIn], user_id: int) -> list[Task]:
+        '''
+        Создает несколько задач одним многострочным INSERT ... RETURNING в одной транзакции.
+        Задачи возвращаются в порядке переданного списка
+        '''
+        if not tasks:
+            return []
+        change_seq = await allocate_change_seq(self.db, user_id)
+        new_tasks = await self.db.scalars(
+            insert(Task).returning(Task, sort_by_parameter_order=True),
+            [dict(task.model_dump(), user_id=user_id, change_seq=change_seq) for task in tasks]
+        )
+        new_tasks = new_tasks.all()
+        await self.db.commit()
+        await self._tasks_changed(user_id, TaskEventType.CREATED, [new_task.id for new_task in new_tasks])
+        return new_tasks
+
+    async def load_tasks(self, tasks: list[TaskIn], user_id: int) -> int:
+        '''
+        Массово загружает задачи без возврата строк: в PostgreSQL через COPY (asyncpg),
+        в остальных СУБД через executemany. Возвращает количество загруженных задач
+        '''
+        if not tasks:
+            return 0
+        created_at = datetime.now()
+        change_seq = await allocate_change_seq(self.db, user_id)
+        rows = [
+            dict(task.model_dump(), user_id=user_id, is_active=True, created_at=created_at, change_seq=change_seq)
+            for task in tasks
+        ]
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            columns = list(rows[0])
+            connection = await self.db.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Task.__tablename__,
+                columns=columns,
+                # Enum-колонки хранят имена элементов (PENDING, HIGH, ...)
+                records=[
+                    tuple(row[column].name if column in ("status", "priority") else row[column] for column in columns)
+                    for row in rows
+                ]
+            )
+        else:
+            await self.db.execute(insert(Task.__table__), rows)
+        await self.db.commit()
+        # ID загруженных задач не возвращаются, клиент получает их из ленты изменений
+        await self._tasks_changed(user_id, TaskEventType.CREATED, [])
+        return len(rows)
+
     async def update_task(self, task_id: int, task_dict: dict) -> Task:
         '''
         Обновляет задачу с указанным ID
@@ -53,19 +428,142 @@ class TaskCrud:
         await self.db.execute(
             update(Task)
             .where(Task.id == task_id)
-            .values(**task_dict)
+            .values(**task_dict, change_seq=await allocate_change_seq(self.db, updated_task.user_id))
         )
         await self.db.commit()
         await self.db.refresh(updated_task)
+        await self._tasks_changed(updated_task.user_id, TaskEventType.UPDATED, [task_id])
+        return updated_task
+
+    async def update_user_task(self, task_id: int, user_id: int, task_dict: dict) -> Task | None:
+        '''
+        Обновляет активную задачу пользователя одним запросом (UPDATE ... RETURNING).
+        Если задача не найдена или принадлежит другому пользователю, вернется None
+        '''
+        # Номер изменения выделяется только для найденной задачи: 403 и 404 ничего не записывают
+        change_seq = await allocate_change_seq(self.db, user_id, task_id)
+        if change_seq is None:
+            # Строка пользователя не изменилась: фиксация лишь завершает транзакцию
+            await self.db.commit()
+            return None
+        updated_task = await self.db.scalar(
+            update(Task)
+            .where(Task.id == task_id, Task.user_id == user_id, Task.is_active.is_(True))
+            .values(**task_dict, change_seq=change_seq)
+            .returning(Task)
+        )
+        await self.db.commit()
+        if updated_task:
+            await self._tasks_changed(user_id, TaskEventType.UPDATED, [task_id])
         return updated_task
 
+    async def delete_user_task(self, task_id: int, user_id: int) -> bool:
+        '''
+        Выполняет мягкое удаление активной задачи пользователя одним запросом.
+        Возвращает False, если задача не найдена или принадлежит другому пользователю
+        '''
+        change_seq = await allocate_change_seq(self.db, user_id, task_id)
+        if change_seq is None:
+            # Строка пользователя не изменилась: фиксация лишь завершает транзакцию
+            await self.db.commit()
+            return False
+        deleted_id = await self.db.scalar(
+            update(Task)
+            .where(Task.id == task_id, Task.user_id == user_id, Task.is_active.is_(True))
+            .values(is_active=False, change_seq=change_seq)
+            .returning(Task.id)
+        )
+        await self.db.commit()
+        if deleted_id is None:
+            return False
+        await self._tasks_changed(user_id, TaskEventType.DELETED, [deleted_id])
+        return True
+
+    async def bulk_update_tasks(
+            self, user_id: int, task_dict: dict,
+            ids: list[int] | None = None, filters: TaskFilter | None = None
+    ) -> list[int]:
+        '''
+        Обновляет активные задачи пользователя, выбранные по списку ID и/или фильтру, одним UPDATE.
+        Возвращает ID измененных задач
+        '''
+        return await self._bulk_update(user_id, task_dict, ids, filters, TaskEventType.UPDATED)
+
+    async def bulk_delete_tasks(
+            self, user_id: int, ids: list[int] | None = None, filters: TaskFilter | None = None
+    ) -> list[int]:
+        '''
+        Выполняет мягкое удаление активных задач пользователя, выбранных по списку ID и/или фильтру.
+        Возвращает ID удаленных задач
+        '''
+        return await self._bulk_update(user_id, {"is_active": False}, ids, filters, TaskEventType.DELETED)
+
+    async def _bulk_update(
+            self, user_id: int, values: dict, ids: list[int] | None, filters: TaskFilter | None,
+            event_type: TaskEventType
+    ) -> list[int]:
+        query = (
+            update(Task)
+            .where(Task.user_id == user_id, Task.is_active.is_(True), *task_filter_conditions(filters))
+            .values(**values, change_seq=await allocate_change_seq(self.db, user_id))
+            .returning(Task.id)
+        )
+        if ids is not None:
+            query = query.where(Task.id.in_(ids))
+        affected_ids = (await self.db.scalars(query)).all()
+        await self.db.commit()
+        if affected_ids:
+            await self._tasks_changed(user_id, event_type, affected_ids)
+        return affected_ids
+
     async def delete_task(self, task_id: int) -> None:
         '''
         Выполняет мягкое удаление задачи (значение is_active меняется на False)
         '''
+        user_id = await self.db.scalar(select(Task.user_id).where(Task.id == task_id))
+        if user_id is None:
+            return
         await self.db.execute(
             update(Task)
             .where(Task.id == task_id)
-            .values(is_active=False)
+            .values(is_active=False, change_seq=await allocate_change_seq(self.db, user_id))
+        )
+        await self.db.commit()
+        await self._tasks_changed(user_id, TaskEventType.DELETED, [task_id])
+
+    async def archive_inactive_tasks(self, older_than: datetime, batch_size: int) -> int:
+        '''
+        Переносит в архив одну порцию задач, удаленных раньше older_than, одной транзакцией
+        (INSERT ... SELECT и DELETE по списку ID). Задачи удаленных пользователей не переносятся,
+        так как их восстанавливает restore_user. Возвращает количество перенесенных задач
+        '''
+        rows = (await self.db.execute(
+            select(Task.id, Task.user_id)
+            .where(Task.is_active.is_(False), CHANGED_AT < older_than, Task.user.has(is_active=True))
+            .order_by(Task.id)
+            .limit(batch_size)
+            .with_for_update(of=Task, skip_locked=True)
+        )).all()
+        if not rows:
+            return 0
+        task_ids = [row.id for row in rows]
+        await self.db.execute(
+            insert(TaskArchive).from_select(
+                ARCHIVE_COLUMNS,
+                select(*(getattr(Task, field) for field in ARCHIVE_COLUMNS)).where(Task.id.in_(task_ids))
+            )
         )
+        await self.db.execute(delete(Task).where(Task.id.in_(task_ids)))
         await self.db.commit()
+        # Перенесенные задачи остаются в ленте изменений (из архива), но выпадают из ETag списка
+        for user_id in {row.user_id for row in rows}:
+            await task_cache.invalidate_user(user_id)
+        return len(task_ids)
+
+    async def _tasks_changed(self, user_id: int, event_type: TaskEventType, task_ids: Sequence[int]) -> None:
+        '''
+        Сбрасывает кеш чтения задач пользователя и публикует событие об изменении.
+        Вызывается после фиксации транзакции
+        '''
+        await task_cache.invalidate_user(user_id)
+        await publish_task_event(user_id, event_type, task_ids)
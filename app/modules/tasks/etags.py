@@ -0,0 +1,24 @@
+import hashlib
+from typing import Any
+
+
+def make_etag(*parts: Any) -> str:
+    '''
+    Строит сильный ETag из частей, определяющих представление ресурса
+    '''
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    '''
+    Проверяет заголовок If-None-Match (список ETag через запятую или "*").
+    Для If-None-Match используется слабое сравнение, поэтому префикс W/ игнорируется
+    '''
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,45 @@
+import json
+from typing import AsyncIterator, Iterable
+
+from .enums import TaskEventType
+from .cache import task_cache
+from app.core.events import EventHub, make_backend
+from app.core.config import TASK_EVENTS_BACKEND, TASK_EVENTS_QUEUE_SIZE
+
+
+# Каналы хаба - ID пользователей
+task_events = EventHub(make_backend(TASK_EVENTS_BACKEND, "task_events"), TASK_EVENTS_QUEUE_SIZE)
+# Кеш чтения (и построенные по нему ETag) сбрасывается при изменениях задач во всех процессах
+task_events.add_listener(task_cache.on_event)
+
+
+async def publish_task_event(user_id: int, event_type: TaskEventType, task_ids: Iterable[int]) -> None:
+    '''
+    Публикует событие об изменении задач пользователя.
+    Событие содержит только ID задач: актуальные данные клиент получает из ленты изменений
+    '''
+    await task_events.publish(user_id, {"type": event_type.value, "task_ids": list(task_ids)})
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def task_event_stream(user_id: int, heartbeat: float) -> AsyncIterator[str]:
+    '''
+    Поток событий пользователя в формате Server-Sent Events.
+    Если клиент не успевает забирать события или транспорт мог их потерять (переподключение),
+    отправляется событие resync и поток закрывается:
+    клиент должен догнать состояние через ленту изменений и переподключиться
+    '''
+    async with task_events.subscribe(user_id) as subscription:
+        yield ": connected\n\n"
+        while not subscription.overflowed:
+            event = await subscription.get(heartbeat)
+            if subscription.overflowed:
+                break
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event["type"], event)
+        yield format_sse("resync", {})
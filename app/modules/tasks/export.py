@@ -0,0 +1,46 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+from .crud import TASK_FIELDS
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def ndjson_chunks(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[str]:
+    '''
+    Преобразует порции строк в NDJSON (одна задача на строку)
+    '''
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(row._asdict(), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+async def csv_chunks(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[str]:
+    '''
+    Преобразует порции строк в CSV с заголовком
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TASK_FIELDS)
+    async for rows in partitions:
+        writer.writerows(
+            [value.value if isinstance(value, enum.Enum) else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
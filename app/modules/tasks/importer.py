@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from pydantic import ValidationError
+
+from .crud import TaskCrud
+from .enums import ExportFormat
+from .schemas import TaskIn, TaskImportError, TaskImportOut
+from app.core.config import TASK_IMPORT_CHUNK_SIZE, TASK_IMPORT_MAX_ERRORS, TASK_IMPORT_MAX_RECORD_SIZE
+from app.core.database import async_session_maker
+
+
+class RecordTooLarge(ValueError):
+    '''
+    Строка или запись входных данных превышает допустимый размер
+    '''
+
+    def __init__(self, line: int, max_size: int):
+        super().__init__(f"Запись в строке {line} превышает {max_size} символов")
+        self.line = line
+        self.max_size = max_size
+
+
+@dataclass
+class ImportReport:
+    '''Ход и результат импорта'''
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[TaskImportError] = field(default_factory=list)
+    max_errors: int = TASK_IMPORT_MAX_ERRORS
+
+    def add_error(self, line: int, errors: list[dict[str, Any]]) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(TaskImportError(line=line, errors=errors))
+
+    def to_schema(self) -> TaskImportOut:
+        return TaskImportOut(processed=self.processed, imported=self.imported, failed=self.failed, errors=self.errors)
+
+
+async def iter_lines(
+        chunks: AsyncIterator[bytes], max_size: int = TASK_IMPORT_MAX_RECORD_SIZE
+) -> AsyncIterator[str]:
+    '''
+    Собирает строки из потока байтов, не загружая весь поток в память.
+    Строка длиннее max_size символов прерывает разбор исключением RecordTooLarge
+    '''
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    line_number = 0
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            line_number += 1
+            if len(line) > max_size:
+                raise RecordTooLarge(line_number, max_size)
+            yield line.rstrip("\r")
+        if len(tail) > max_size:
+            raise RecordTooLarge(line_number + 1, max_size)
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail.rstrip("\r")
+
+
+async def iter_records(
+        lines: AsyncIterator[str], import_format: ExportFormat, max_size: int = TASK_IMPORT_MAX_RECORD_SIZE
+) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    '''
+    Разбирает строки NDJSON или CSV (с заголовком) в словари.
+    Возвращает (номер строки, запись, текст ошибки разбора).
+    Многострочная запись CSV длиннее max_size символов прерывает разбор исключением RecordTooLarge
+    '''
+    line_number = 0
+    if import_format == ExportFormat.NDJSON:
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as e:
+                yield line_number, None, str(e)
+        return
+
+    header: list[str] | None = None
+    buffer, start_line = "", 0
+    async for line in lines:
+        line_number += 1
+        if not buffer:
+            start_line = line_number
+        buffer = f"{buffer}\n{line}" if buffer else line
+        if len(buffer) > max_size:
+            raise RecordTooLarge(start_line, max_size)
+        # Поле в кавычках может содержать перевод строки — дочитываем запись
+        if buffer.count('"') % 2:
+            continue
+        values, buffer = next(csv.reader([buffer]), []), ""
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield start_line, None, f"Ожидалось {len(header)} полей, получено {len(values)}"
+            continue
+        # Пустые ячейки пропускаются, чтобы применились значения по умолчанию схемы
+        yield start_line, {key: value for key, value in zip(header, values) if value != ""}, None
+    if buffer:
+        yield start_line, None, "Незакрытые кавычки в конце файла"
+
+
+async def import_tasks(
+        task_crud: TaskCrud,
+        user_id: int,
+        chunks: AsyncIterator[bytes],
+        import_format: ExportFormat,
+        chunk_size: int = TASK_IMPORT_CHUNK_SIZE,
+        progress: Callable[[ImportReport], None] | None = None,
+        max_record_size: int = TASK_IMPORT_MAX_RECORD_SIZE
+) -> ImportReport:
+    '''
+    Потоково импортирует задачи: разбирает входные данные, валидирует записи по схеме TaskIn
+    и загружает их порциями по chunk_size через TaskCrud.load_tasks.
+    Запись длиннее max_record_size символов прерывает импорт исключением RecordTooLarge:
+    уже загруженные порции остаются сохраненными
+    '''
+    report = ImportReport()
+    chunk: list[TaskIn] = []
+
+    async def flush() -> None:
+        report.imported += await task_crud.load_tasks(chunk, user_id)
+        chunk.clear()
+        if progress:
+            progress(report)
+
+    records = iter_records(iter_lines(chunks, max_record_size), import_format, max_record_size)
+    async for line, record, parse_error in records:
+        report.processed += 1
+        if parse_error:
+            report.add_error(line, [{"type": "parse_error", "msg": parse_error}])
+            continue
+        try:
+            chunk.append(TaskIn.model_validate(record))
+        except ValidationError as e:
+            report.add_error(line, e.errors(include_url=False, include_context=False))
+            continue
+        if len(chunk) >= chunk_size:
+            await flush()
+
+    await flush()
+    return report
+
+
+async def read_file(path: Path, size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, size):
+            yield chunk
+
+
+async def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Импорт задач пользователя из NDJSON или CSV")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.NDJSON.value)
+    parser.add_argument("--chunk-size", type=int, default=TASK_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    def print_progress(report: ImportReport) -> None:
+        print(
+            f"обработано: {report.processed}, загружено: {report.imported}, ошибок: {report.failed}",
+            file=sys.stderr
+        )
+
+    async with async_session_maker() as session:
+        report = await import_tasks(
+            TaskCrud(session), args.user_id, read_file(args.path),
+            ExportFormat(args.format), args.chunk_size, print_progress
+        )
+    print(report.to_schema().model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Text, Enum, DateTime, ForeignKey
+from sqlalchemy import BigInteger, String, Text, Enum, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -6,8 +6,44 @@ from app.core.database import Base
 from .enums import TaskPriority, TaskStatus
 
 
+# Условия частичных индексов совпадают с тем, как SQLAlchemy рендерит Task.is_active.is_(True)
+ACTIVE_PG = "is_active IS true"
+ACTIVE_SQLITE = "is_active IS 1"
+INACTIVE_PG = "is_active IS false"
+INACTIVE_SQLITE = "is_active IS 0"
+# Момент изменения задачи: у только что созданных задач updated_at не заполнен
+CHANGED_AT_SQL = "coalesce(updated_at, created_at)"
+# Признак задачи без срока выполнения: первый ключ сортировки по сроку (задачи без срока идут последними)
+DUE_DATE_MISSING_SQL = "(due_date IS NULL)"
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index(
+            "ix_tasks_user_active_created", "user_id", "created_at", "id",
+            postgresql_where=text(ACTIVE_PG), sqlite_where=text(ACTIVE_SQLITE)
+        ),
+        Index(
+            "ix_tasks_user_active_due", "user_id", text(DUE_DATE_MISSING_SQL), "due_date", "id",
+            postgresql_where=text(ACTIVE_PG), sqlite_where=text(ACTIVE_SQLITE)
+        ),
+        Index(
+            "ix_tasks_user_active_status", "user_id", "status", "created_at", "id",
+            postgresql_where=text(ACTIVE_PG), sqlite_where=text(ACTIVE_SQLITE)
+        ),
+        Index(
+            "ix_tasks_active_due_date", "due_date",
+            postgresql_where=text(f"{ACTIVE_PG} AND due_date IS NOT NULL"),
+            sqlite_where=text(f"{ACTIVE_SQLITE} AND due_date IS NOT NULL")
+        ),
+        Index("ix_tasks_user_change_seq", "user_id", "change_seq", "id"),
+        Index("ix_tasks_user_id", "user_id", "id"),
+        Index(
+            "ix_tasks_inactive_changed", text(CHANGED_AT_SQL),
+            postgresql_where=text(INACTIVE_PG), sqlite_where=text(INACTIVE_SQLITE)
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -19,5 +55,31 @@ class Task(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now, nullable=False)
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None, onupdate=datetime.now)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Номер изменения в пределах пользователя (users.task_change_seq на момент записи), ключ ленты изменений
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
 
     user = relationship("User", back_populates="tasks")
+
+
+class TaskArchive(Base):
+    '''
+    Архив мягко удаленных задач, перенесенных из tasks по истечении срока хранения.
+    Архивные задачи остаются в ленте изменений как удаленные, поэтому номер изменения сохраняется
+    '''
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        Index("ix_tasks_archive_user_id", "user_id", "id"),
+        Index("ix_tasks_archive_user_change_seq", "user_id", "change_seq", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    status: Mapped['TaskStatus'] = mapped_column(Enum(TaskStatus), nullable=False)
+    priority: Mapped['TaskPriority'] = mapped_column(Enum(TaskPriority), nullable=False)
+    due_date: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now, nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
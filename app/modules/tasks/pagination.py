@@ -0,0 +1,67 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, and_, or_, false, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class InvalidCursor(ValueError):
+    '''
+    Курсор пагинации не удалось разобрать
+    '''
+
+
+def encode_cursor(values: list[Any], tag: str | None = None) -> str:
+    '''
+    Кодирует значения ключа сортировки последней строки в непрозрачный курсор.
+    tag позволяет отличить курсоры разных сортировок
+    '''
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps([tag, payload], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: list[tuple[ColumnElement, bool]], tag: str | None = None) -> list[Any]:
+    '''
+    Декодирует курсор и приводит значения к типам выражений ключа сортировки
+    '''
+    try:
+        cursor_tag, values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if cursor_tag != tag or not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidCursor(cursor)
+
+    coerced = []
+    for (expr, _), value in zip(keys, values):
+        if isinstance(expr.type, DateTime) and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise InvalidCursor(cursor)
+        coerced.append(value)
+    return coerced
+
+
+def keyset_condition(keys: list[tuple[ColumnElement, bool]], values: list[Any]) -> ColumnElement:
+    '''
+    Строит условие "строка идет после values" для ключа сортировки keys
+    (список пар: выражение, сортировка по убыванию).
+    Значение None допускается только в выражениях, равенство по которым проверяется через IS
+    '''
+    # Логические значения (например, признак отсутствия срока) сравниваются как литералы:
+    # SQLAlchemy не допускает < и > с True/False
+    values = [literal(value) if isinstance(value, bool) else value for value in values]
+    conditions = []
+    for i, ((expr, descending), value) in enumerate(zip(keys, values)):
+        prefix = [
+            prev_expr.is_(None) if prev_value is None else prev_expr == prev_value
+            for (prev_expr, _), prev_value in zip(keys[:i], values[:i])
+        ]
+        if value is None:
+            continue
+        conditions.append(and_(*prefix, expr < value if descending else expr > value))
+    return or_(*conditions) if conditions else false()
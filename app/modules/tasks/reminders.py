@@ -0,0 +1,342 @@
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Hashable, Protocol
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .models import Task
+from .enums import TaskEventType, TaskStatus
+from .events import task_events, publish_task_event
+from .pagination import keyset_condition
+from app.core.database import async_session_maker
+from app.core.events import EventHub, PostgresEventBackend, RESYNC_EVENT
+from app.core.leader import LeaderLock, LocalLeaderLock, PostgresAdvisoryLock, make_leader_lock
+from app.core.config import (
+    DATABASE_URL, TASK_REMINDER_LEAD_MINUTES, TASK_REMINDER_WINDOW_MINUTES, TASK_REMINDER_BATCH_SIZE,
+    TASK_REMINDER_LEADER_RETRY
+)
+
+
+logger = logging.getLogger(__name__)
+
+REMINDER_COLUMNS = [Task.id, Task.user_id, Task.title, Task.due_date, Task.status, Task.is_active]
+DUE_KEYS = [(Task.due_date, False), (Task.id, False)]
+# Ключ advisory-блокировки лидера планировщика напоминаний
+REMINDER_LOCK_ID = 7_310_420_001
+
+
+def as_utc(value: datetime) -> datetime:
+    '''
+    Приводит дату к UTC (SQLite возвращает даты без часового пояса)
+    '''
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True)
+class Reminder:
+    task_id: int
+    user_id: int
+    title: str
+    due_date: datetime
+
+
+class Notifier(Protocol):
+    '''
+    Способ доставки напоминаний
+    '''
+
+    async def notify(self, reminder: Reminder) -> None:
+        ...
+
+
+class EventNotifier:
+    '''
+    Отправляет напоминание событием reminder в поток событий пользователя
+    '''
+
+    async def notify(self, reminder: Reminder) -> None:
+        await publish_task_event(reminder.user_id, TaskEventType.REMINDER, [reminder.task_id])
+
+
+class InMemoryNotifier:
+    '''
+    Сохраняет напоминания в списке (для тестов)
+    '''
+
+    def __init__(self):
+        self.sent: list[Reminder] = []
+
+    async def notify(self, reminder: Reminder) -> None:
+        self.sent.append(reminder)
+
+
+class ReminderScheduler:
+    '''
+    Планировщик напоминаний о сроке выполнения задач.
+    Задачи со сроком в ближайшем окне загружаются порциями по индексу due_date и хранятся в куче
+    по времени напоминания; цикл спит до ближайшего напоминания или подгрузки следующего окна.
+    Изменения задач приходят из хаба событий и обрабатываются точечно, без повторного сканирования.
+    Устаревшие элементы кучи не удаляются, а пропускаются при извлечении.
+    Цикл запускается в каждом процессе, но напоминания отправляет только держатель блокировки lock;
+    остальные процессы раз в leader_retry секунд пытаются ее захватить
+    '''
+
+    def __init__(
+            self, session_maker: async_sessionmaker[AsyncSession], notifier: Notifier, hub: EventHub,
+            lead: timedelta, window: timedelta, batch_size: int,
+            lock: LeaderLock | None = None, leader_retry: float = 30
+    ):
+        self.session_maker = session_maker
+        self.notifier = notifier
+        self.hub = hub
+        self.lead = lead
+        self.window = window
+        self.batch_size = batch_size
+        self.lock = lock or LocalLeaderLock()
+        self.leader_retry = leader_retry
+        self.leading = False
+
+        self.heap: list[tuple[datetime, int, datetime]] = []
+        self.scheduled: dict[int, Reminder] = {}
+        # Срок, о котором уже напомнили, чтобы не повторять напоминание после несвязанных изменений задачи
+        self.notified: dict[int, datetime] = {}
+        self.loaded_until: datetime | None = None
+        self.pending_ids: set[int] = set()
+        self.pending_users: set[int] = set()
+        self.resync = False
+        self.wakeup = asyncio.Event()
+        self.runner: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if isinstance(self.lock, PostgresAdvisoryLock) and not isinstance(self.hub.backend, PostgresEventBackend):
+            # Лидер не получает изменения задач из других процессов: новые задачи в уже загруженном окне
+            # останутся без напоминаний до следующей загрузки окна
+            logger.error(
+                "Планировщик напоминаний выбирает лидера через PostgreSQL, но события задач передаются "
+                "только внутри процесса: установите TASK_EVENTS_BACKEND=postgres"
+            )
+        self.hub.add_listener(self.on_event)
+        self.runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self.hub.remove_listener(self.on_event)
+        if self.runner is not None:
+            self.runner.cancel()
+            try:
+                await self.runner
+            except asyncio.CancelledError:
+                pass
+            self.runner = None
+        await self.lock.release()
+        self.leading = False
+
+    def on_event(self, key: Hashable, event: dict[str, Any]) -> None:
+        '''
+        Запоминает измененные задачи из события хаба и будит цикл планировщика
+        '''
+        if event.get("type") == TaskEventType.REMINDER.value:
+            return
+        if event.get("type") == RESYNC_EVENT["type"]:
+            # События могли быть потеряны: расписание строится заново
+            self.resync = True
+        elif event.get("task_ids"):
+            self.pending_ids.update(event["task_ids"])
+        else:
+            # ID не известны (массовая загрузка): перечитываем окно задач пользователя
+            self.pending_users.add(key)
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            if not await self.ensure_leader():
+                # События приходят и в неведущий процесс, но обрабатывает их только лидер
+                self.pending_ids.clear()
+                self.pending_users.clear()
+                await asyncio.sleep(self.leader_retry)
+                continue
+            now = datetime.now(timezone.utc)
+            try:
+                await self.tick(now)
+            except Exception:
+                logger.exception("Ошибка планировщика напоминаний")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.seconds_until_next(now))
+            except asyncio.TimeoutError:
+                pass
+
+    async def ensure_leader(self) -> bool:
+        '''
+        Захватывает или подтверждает лидерство. При смене роли расписание строится заново:
+        новый лидер загружает его из базы, бывший - освобождает память
+        '''
+        try:
+            leading = await self.lock.acquire()
+        except Exception:
+            logger.exception("Не удалось проверить блокировку планировщика напоминаний")
+            leading = False
+        if leading != self.leading:
+            logger.info("Планировщик напоминаний %s", "стал ведущим" if leading else "перестал быть ведущим")
+            self.leading = leading
+            self.resync = True
+            if not leading:
+                self.clear_schedule()
+        return leading
+
+    def clear_schedule(self) -> None:
+        self.heap, self.scheduled, self.loaded_until = [], {}, None
+        self.pending_ids, self.pending_users = set(), set()
+
+    async def tick(self, now: datetime) -> None:
+        '''
+        Подгружает окно при необходимости, применяет изменения задач и отправляет наступившие напоминания
+        '''
+        if self.resync:
+            self.resync = False
+            self.clear_schedule()
+        if self.loaded_until is None or self.loaded_until < now + self.lead + self.window / 2:
+            await self.load_window(now)
+        await self.apply_changes(now)
+        await self.fire_due(now)
+
+    def seconds_until_next(self, now: datetime) -> float:
+        reload_at = self.loaded_until - self.lead - self.window / 2
+        next_at = min(self.heap[0][0], reload_at) if self.heap else reload_at
+        return max((next_at - now).total_seconds(), 0.0)
+
+    async def load_window(self, now: datetime) -> None:
+        '''
+        Загружает задачи со сроком до now + lead + window, продолжая с конца предыдущего окна
+        '''
+        start = self.loaded_until or now
+        end = now + self.lead + self.window
+        self.loaded_until = end
+        query = (
+            select(*REMINDER_COLUMNS)
+            .where(
+                Task.is_active.is_(True), Task.due_date.is_not(None),
+                Task.due_date >= start, Task.due_date < end
+            )
+            .order_by(Task.due_date, Task.id)
+            .limit(self.batch_size)
+        )
+        last = None
+        async with self.session_maker() as session:
+            while True:
+                batch_query = query if last is None else query.where(keyset_condition(DUE_KEYS, last))
+                rows = (await session.execute(batch_query)).all()
+                for row in rows:
+                    self.schedule(row, now)
+                if len(rows) < self.batch_size:
+                    break
+                last = [rows[-1].due_date, rows[-1].id]
+
+        # Сроки в прошлом больше не изменятся без события, отметки о них не нужны
+        self.notified = {
+            task_id: due_date for task_id, due_date in self.notified.items() if due_date >= now
+        }
+
+    async def apply_changes(self, now: datetime) -> None:
+        '''
+        Перепланирует задачи, измененные после прошлого шага
+        '''
+        task_ids, self.pending_ids = list(self.pending_ids), set()
+        user_ids, self.pending_users = list(self.pending_users), set()
+        if not task_ids and not user_ids:
+            return
+
+        async with self.session_maker() as session:
+            for i in range(0, len(task_ids), self.batch_size):
+                chunk = task_ids[i:i + self.batch_size]
+                rows = (await session.execute(select(*REMINDER_COLUMNS).where(Task.id.in_(chunk)))).all()
+                for task_id in set(chunk) - {row.id for row in rows}:
+                    self.unschedule(task_id)
+                for row in rows:
+                    self.schedule(row, now)
+            for user_id in user_ids:
+                rows = await session.execute(
+                    select(*REMINDER_COLUMNS)
+                    .where(
+                        Task.user_id == user_id, Task.is_active.is_(True), Task.due_date.is_not(None),
+                        Task.due_date >= now, Task.due_date < self.loaded_until
+                    )
+                )
+                for row in rows:
+                    self.schedule(row, now)
+
+    def schedule(self, row: Any, now: datetime) -> None:
+        '''
+        Ставит напоминание для строки задачи или снимает его, если задача больше не подходит
+        '''
+        due_date = as_utc(row.due_date) if row.due_date is not None else None
+        if (
+            not row.is_active or row.status == TaskStatus.COMPLETED or due_date is None
+            or due_date < now or due_date >= self.loaded_until
+        ):
+            self.unschedule(row.id)
+            return
+        if self.notified.get(row.id) == due_date:
+            return
+        current = self.scheduled.get(row.id)
+        self.scheduled[row.id] = Reminder(row.id, row.user_id, row.title, due_date)
+        if current is None or current.due_date != due_date:
+            heapq.heappush(self.heap, (due_date - self.lead, row.id, due_date))
+
+    def unschedule(self, task_id: int) -> None:
+        self.scheduled.pop(task_id, None)
+
+    async def fire_due(self, now: datetime) -> None:
+        '''
+        Отправляет напоминания, время которых наступило.
+        Перед отправкой задачи перечитываются одним запросом: событие об изменении задачи могло не дойти
+        (например, при транспорте событий memory изменения других процессов не видны)
+        '''
+        due: list[Reminder] = []
+        while self.heap and self.heap[0][0] <= now:
+            _, task_id, due_date = heapq.heappop(self.heap)
+            reminder = self.scheduled.get(task_id)
+            if reminder is None or reminder.due_date != due_date:
+                continue
+            del self.scheduled[task_id]
+            due.append(reminder)
+        if not due:
+            return
+
+        rows = {}
+        async with self.session_maker() as session:
+            for i in range(0, len(due), self.batch_size):
+                chunk = [reminder.task_id for reminder in due[i:i + self.batch_size]]
+                result = await session.execute(select(*REMINDER_COLUMNS).where(Task.id.in_(chunk)))
+                rows.update((row.id, row) for row in result)
+
+        for reminder in due:
+            row = rows.get(reminder.task_id)
+            if (
+                row is None or not row.is_active or row.status == TaskStatus.COMPLETED
+                or row.due_date is None or as_utc(row.due_date) != reminder.due_date
+            ):
+                # Задача удалена, выполнена или перенесена: новый срок планируется заново
+                if row is not None:
+                    self.schedule(row, now)
+                continue
+            self.notified[reminder.task_id] = reminder.due_date
+            try:
+                await self.notifier.notify(reminder)
+            except Exception:
+                logger.exception("Не удалось отправить напоминание о задаче %s", reminder.task_id)
+
+
+reminder_scheduler = ReminderScheduler(
+    async_session_maker, EventNotifier(), task_events,
+    lead=timedelta(minutes=TASK_REMINDER_LEAD_MINUTES),
+    window=timedelta(minutes=TASK_REMINDER_WINDOW_MINUTES),
+    batch_size=TASK_REMINDER_BATCH_SIZE,
+    lock=make_leader_lock(DATABASE_URL, REMINDER_LOCK_ID),
+    leader_retry=TASK_REMINDER_LEADER_RETRY
+)
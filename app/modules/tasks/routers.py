@@ -1,54 +1,243 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Annotated
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Annotated, Any
+from datetime import datetime
 
 from .crud import TaskCrud
+from .pagination import InvalidCursor
 from app.modules.users.crud import UserCrud
 from app.modules.users.models import User
-from .schemas import TaskIn, TaskOut, TaskUpdate
+from .schemas import (
+    TaskIn, TaskOut, TaskPartialOut, TaskUpdate, TaskFilter, TaskBatchItem, TaskBatchOut,
+    TaskSelection, TaskBulkUpdate, TaskBulkResult, TaskImportOut, TaskChangesOut, TaskArchiveOut
+)
+from .enums import TaskStatus, TaskPriority, TaskSort, ExportFormat
+from .export import ndjson_chunks, csv_chunks
+from .importer import import_tasks, RecordTooLarge
+from .serializers import dump_task_rows, dump_task_row, parse_fields
+from .etags import make_etag, etag_matches
+from .events import task_event_stream
 from app.core.dependencies import get_task_crud, get_user_crud
 from app.core.auth import get_current_user
+from app.core.config import TASK_BATCH_MAX_SIZE, TASK_EVENTS_HEARTBEAT
 
 
 tasks_router = APIRouter()
 
+# Ответы можно хранить только в частном кеше клиента и обязательно перепроверять по ETag
+CACHE_CONTROL = "private, no-cache"
 
-@tasks_router.get("/", response_model=list[TaskOut], status_code=status.HTTP_200_OK)
+
+def task_not_found(task_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Активная задача с ID: {task_id} не найдена"
+    )
+
+
+def parse_fields_param(fields: str | None) -> tuple[str, ...] | None:
+    '''
+    Разбирает параметр fields, выбрасывая 400 для неизвестных полей
+    '''
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {e}"
+        )
+
+
+async def check_task_access(task_crud: TaskCrud, task_id: int, user_id: int, forbidden_detail: str) -> None:
+    '''
+    Проверяет существование активной задачи и права владельца, выбрасывая 404 или 403
+    '''
+    owner_id = await task_crud.get_task_owner(task_id)
+    if owner_id is None:
+        raise task_not_found(task_id)
+    if owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=forbidden_detail
+        )
+
+
+@tasks_router.get("/", response_model=list[TaskPartialOut], status_code=status.HTTP_200_OK)
 async def get_user_tasks(
+    request: Request,
     task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
     user_crud: Annotated[UserCrud, Depends(get_user_crud)],
     current_user: Annotated[User, Depends(get_current_user)],
+    if_none_match: Annotated[str | None, Header()] = None,
+    skip: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: Annotated[str | None, Query(description="Курсор следующей страницы (заменяет skip)")] = None,
+    status_in: Annotated[list[TaskStatus] | None, Query(alias="status")] = None,
+    priority_in: Annotated[list[TaskPriority] | None, Query(alias="priority")] = None,
+    due_from: Annotated[datetime | None, Query()] = None,
+    due_to: Annotated[datetime | None, Query()] = None,
+    overdue: Annotated[bool, Query()] = False,
+    sort: Annotated[TaskSort, Query()] = TaskSort.CREATED_AT,
+    fields: Annotated[str | None, Query(description="Возвращаемые поля через запятую (id всегда включен)")] = None
+):
+    '''
+    Возвращает активные задачи пользователя с фильтрацией по статусу, приоритету и сроку выполнения.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    Строки сериализуются напрямую в JSON, минуя модели TaskOut.
+    ETag строится по "водяному знаку" задач пользователя и параметрам запроса, поэтому
+    при совпадении If-None-Match ответ 304 возвращается без выборки страницы
+    '''
+    filters = TaskFilter(
+        status=status_in, priority=priority_in,
+        due_from=due_from, due_to=due_to, overdue=overdue
+    )
+    selected_fields = parse_fields_param(fields)
+
+    # Результат overdue зависит от текущего времени, а не только от данных
+    etag = None
+    if not overdue:
+        watermark = await task_crud.get_user_tasks_watermark(current_user.id)
+        etag = make_etag(current_user.id, *watermark, request.url.query)
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+            )
+    try:
+        user_tasks, next_cursor = await task_crud.get_user_tasks_page(
+            current_user.id, limit, cursor, skip, filters, sort, selected_fields
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if etag:
+        headers["ETag"] = etag
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(dump_task_rows(user_tasks, selected_fields), media_type="application/json", headers=headers)
+
+
+@tasks_router.get("/search", response_model=list[TaskOut], status_code=status.HTTP_200_OK)
+async def search_tasks(
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    q: Annotated[str, Query(min_length=1, max_length=255, description="Поисковый запрос")],
     skip: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=1000)] = 100
 ):
     '''
-    Возвращает активные задачи пользователя
+    Полнотекстовый поиск по заголовку и описанию активных задач пользователя
     '''
-    user_tasks = await task_crud.get_user_tasks(current_user.id, skip, limit)
-    return user_tasks
+    found_tasks = await task_crud.search_user_tasks(current_user.id, q, skip, limit)
+    return found_tasks
 
 
-@tasks_router.get("/{task_id}", response_model=TaskOut, status_code=status.HTTP_200_OK)
-async def get_task(
-    task_id: int,
+@tasks_router.get("/export", status_code=status.HTTP_200_OK)
+async def export_tasks(
     task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
-    current_user: Annotated[User, Depends(get_current_user)]
+    current_user: Annotated[User, Depends(get_current_user)],
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    include_inactive: Annotated[bool, Query(description="Включать удаленные задачи")] = False
 ):
     '''
-    Возвращает данные о задаче с указанным ID
+    Потоковая выгрузка всех задач пользователя в формате NDJSON или CSV
     '''
+    partitions = task_crud.stream_user_tasks(current_user.id, include_inactive)
+    if export_format == ExportFormat.CSV:
+        return StreamingResponse(
+            csv_chunks(partitions),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="tasks.csv"'}
+        )
+    return StreamingResponse(
+        ndjson_chunks(partitions),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="tasks.ndjson"'}
+    )
 
-    db_task = await task_crud.get_task(task_id)
-    if not db_task:
+
+@tasks_router.get("/changes", response_model=TaskChangesOut, status_code=status.HTTP_200_OK)
+async def get_task_changes(
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    since: Annotated[str | None, Query(description="Курсор из предыдущего ответа ленты")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100
+):
+    '''
+    Лента изменений для инкрементальной синхронизации: задачи, созданные, измененные
+    или удаленные после курсора since. Удаленные задачи (в том числе перенесенные в архив)
+    возвращаются с is_active = False.
+    Клиент повторяет запрос с полученным курсором, пока has_more равен True
+    '''
+    try:
+        changed_tasks, cursor, has_more = await task_crud.get_user_task_changes(current_user.id, since, limit)
+    except InvalidCursor:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Активная задача с ID: {task_id} не найдена"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
         )
-    if db_task.user_id != current_user.id:
+    return TaskChangesOut(tasks=changed_tasks, cursor=cursor, has_more=has_more)
+
+
+@tasks_router.get("/archive", response_model=list[TaskArchiveOut], status_code=status.HTTP_200_OK)
+async def get_archived_tasks(
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    skip: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100
+):
+    '''
+    Возвращает задачи пользователя, перенесенные в архив после срока хранения удаленных задач
+    '''
+    archived_tasks = await task_crud.get_archived_tasks(current_user.id, skip, limit)
+    return archived_tasks
+
+
+@tasks_router.get("/events", status_code=status.HTTP_200_OK)
+async def get_task_events(
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    '''
+    Поток событий об изменении задач пользователя (Server-Sent Events): created, updated, deleted с ID задач.
+    Событие resync означает, что клиент отстал: нужно догнать состояние через /changes и переподключиться
+    '''
+    return StreamingResponse(
+        task_event_stream(current_user.id, TASK_EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@tasks_router.get("/{task_id}", response_model=TaskPartialOut, status_code=status.HTTP_200_OK)
+async def get_task(
+    task_id: int,
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    fields: Annotated[str | None, Query(description="Возвращаемые поля через запятую (id всегда включен)")] = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    '''
+    Возвращает данные о задаче с указанным ID.
+    Поддерживает условный запрос по ETag (id, updated_at): при совпадении возвращается 304 без сериализации
+    '''
+    selected_fields = parse_fields_param(fields)
+    db_task = await task_crud.get_task_row(task_id, selected_fields)
+    if not db_task:
+        raise task_not_found(task_id)
+    if db_task["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Только владелец имеет доступ к задаче"
         )
-    return db_task
+    etag = make_etag(task_id, db_task["updated_at"] or db_task["created_at"], selected_fields)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(dump_task_row(db_task, selected_fields), media_type="application/json", headers=headers)
 
 
 @tasks_router.post("/", response_model=TaskOut, status_code=status.HTTP_201_CREATED)
@@ -65,6 +254,95 @@ async def create_task(
     return new_task
 
 
+@tasks_router.post("/batch", response_model=TaskBatchOut, status_code=status.HTTP_201_CREATED)
+async def create_tasks_batch(
+    items: Annotated[list[Any], Body(min_length=1, max_length=TASK_BATCH_MAX_SIZE)],
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    strict: Annotated[bool, Query(description="Отклонить весь пакет при любой ошибке")] = False
+):
+    '''
+    Создает пакет задач одним запросом к базе.
+    Ошибки валидации возвращаются по индексу задачи, в строгом режиме пакет отклоняется целиком
+    '''
+    valid_tasks: list[tuple[int, TaskIn]] = []
+    results: list[TaskBatchItem] = []
+    for index, item in enumerate(items):
+        try:
+            valid_tasks.append((index, TaskIn.model_validate(item)))
+        except ValidationError as e:
+            results.append(TaskBatchItem(index=index, errors=e.errors(include_url=False, include_context=False)))
+
+    if strict and results:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=[item.model_dump(exclude_none=True) for item in results]
+        )
+
+    new_tasks = await task_crud.create_tasks([task for _, task in valid_tasks], current_user.id)
+    for (index, _), new_task in zip(valid_tasks, new_tasks):
+        results.append(TaskBatchItem(index=index, task=TaskOut.model_validate(new_task)))
+    results.sort(key=lambda item: item.index)
+
+    return TaskBatchOut(created=len(new_tasks), failed=len(items) - len(new_tasks), results=results)
+
+
+@tasks_router.post("/import", response_model=TaskImportOut, status_code=status.HTTP_200_OK)
+async def import_user_tasks(
+    request: Request,
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    import_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON
+):
+    '''
+    Потоковый импорт задач из тела запроса в формате NDJSON или CSV (с заголовком).
+    Записи валидируются и загружаются порциями, ошибки возвращаются по номеру строки.
+    Слишком длинная запись (например, незакрытые кавычки CSV) прерывает импорт с ответом 422
+    '''
+    try:
+        report = await import_tasks(task_crud, current_user.id, request.stream(), import_format)
+    except RecordTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return report.to_schema()
+
+
+@tasks_router.patch("/bulk", response_model=TaskBulkResult, status_code=status.HTTP_200_OK)
+async def bulk_update_tasks(
+    bulk_update: TaskBulkUpdate,
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    '''
+    Обновляет активные задачи пользователя, выбранные по списку ID и/или фильтру
+    '''
+    task_dict = bulk_update.changes.model_dump(exclude_unset=True)
+    if not task_dict:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Должно быть хотя-бы одно поле для изменения"
+        )
+    affected_ids = await task_crud.bulk_update_tasks(
+        current_user.id, task_dict, bulk_update.ids, bulk_update.filter
+    )
+    return TaskBulkResult(affected=len(affected_ids))
+
+
+@tasks_router.post("/bulk/delete", response_model=TaskBulkResult, status_code=status.HTTP_200_OK)
+async def bulk_delete_tasks(
+    selection: TaskSelection,
+    task_crud: Annotated[TaskCrud, Depends(get_task_crud)],
+    current_user: Annotated[User, Depends(get_current_user)]
+):
+    '''
+    Выполняет мягкое удаление активных задач пользователя, выбранных по списку ID и/или фильтру
+    '''
+    affected_ids = await task_crud.bulk_delete_tasks(current_user.id, selection.ids, selection.filter)
+    return TaskBulkResult(affected=len(affected_ids))
+
+
 @tasks_router.patch("/{task_id}", response_model=TaskOut, status_code=status.HTTP_200_OK)
 async def update_task(
     task_id: int, task_update: TaskUpdate,
@@ -74,24 +352,17 @@ async def update_task(
     '''
     Обновляет указанную задачу
     '''
-    db_task = await task_crud.get_task(task_id)
-    if not db_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Активная задача с ID: {task_id} не найдена"
-        )
-    if db_task.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Только владелец может изменить задачу"
-        )
     task_dict = task_update.model_dump(exclude_unset=True)
     if not task_dict:
+        await check_task_access(task_crud, task_id, current_user.id, "Только владелец может изменить задачу")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Должно быть хотя-бы одно поле для изменения"
         )
-    updated_task = await task_crud.update_task(task_id, task_dict)
+    updated_task = await task_crud.update_user_task(task_id, current_user.id, task_dict)
+    if not updated_task:
+        await check_task_access(task_crud, task_id, current_user.id, "Только владелец может изменить задачу")
+        raise task_not_found(task_id)
     return updated_task
 
 
@@ -104,15 +375,6 @@ async def delete_task(
     '''
     Выполняет мягкое удаление указанной задачи
     '''
-    db_task = await task_crud.get_task(task_id)
-    if not db_task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Активная задача с ID: {task_id} не найдена"
-        )
-    if db_task.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Только владелец может удалить задачу"
-        )
-    await task_crud.delete_task(task_id)
+    if not await task_crud.delete_user_task(task_id, current_user.id):
+        await check_task_access(task_crud, task_id, current_user.id, "Только владелец может удалить задачу")
+        raise task_not_found(task_id)
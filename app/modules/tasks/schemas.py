@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 from datetime import datetime, timezone
+from typing import Any
 
+from app.core.config import TASK_BATCH_MAX_SIZE
 from .enums import TaskStatus, TaskPriority
 
 
@@ -26,8 +28,10 @@ class TaskIn(TaskBase):
     priority: TaskPriority = Field(TaskPriority.MEDIUM, description="Приоритет выполнения задачи")
 
 
-class TaskOut(TaskBase):
-    '''Схема для возврата задачи'''
+class TaskOut(BaseModel):
+    '''Схема для возврата задачи (без валидаторов входных данных)'''
+    description: str | None = Field(None, description="Описание задачи")
+    due_date: datetime | None = Field(None, description="Срок выполнения задачи")
     id: int = Field(..., description="Уникальный идентификатор задачи")
     title: str = Field(..., description="Заголовок задачи")
     status: TaskStatus = Field(..., description="Статус задачи")
@@ -40,9 +44,122 @@ class TaskOut(TaskBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TaskPartialOut(BaseModel):
+    '''Схема для возврата задачи с выборкой полей (fields): кроме id, каждое поле может отсутствовать'''
+    id: int = Field(..., description="Уникальный идентификатор задачи")
+    title: str | None = Field(None, description="Заголовок задачи")
+    description: str | None = Field(None, description="Описание задачи")
+    status: TaskStatus | None = Field(None, description="Статус задачи")
+    priority: TaskPriority | None = Field(None, description="Приоритет выполнения задачи")
+    due_date: datetime | None = Field(None, description="Срок выполнения задачи")
+    user_id: int | None = Field(None, description="Уникальный идентификатор пользователя")
+    is_active: bool | None = Field(None, description="Активность задачи")
+    created_at: datetime | None = Field(None, description="Дата создания задачи")
+    updated_at: datetime | None = Field(None, description="Дата обновления задачи")
+
+
 class TaskUpdate(TaskBase):
     '''Схема для обновления задачи'''
 
     title: str | None = Field(None, description="Заголовок задачи")
     status: TaskStatus | None = Field(None, description="Статус задачи")
     priority: TaskPriority | None = Field(None, description="Приоритет выполнения задачи")
+
+    @field_validator("title", "status", "priority", mode="after")
+    def validate_not_null(cls, v):
+        # Поля можно не передавать, но явный null нарушил бы NOT NULL в базе
+        if v is None:
+            raise ValueError("Поле не может быть null")
+        return v
+
+
+class TaskFilter(BaseModel):
+    '''Схема фильтра задач'''
+    status: list[TaskStatus] | None = Field(None, description="Допустимые статусы")
+    priority: list[TaskPriority] | None = Field(None, description="Допустимые приоритеты")
+    due_from: datetime | None = Field(None, description="Срок выполнения не раньше")
+    due_to: datetime | None = Field(None, description="Срок выполнения не позже")
+    overdue: bool = Field(False, description="Только просроченные незавершенные задачи")
+
+    def is_empty(self) -> bool:
+        '''Фильтр без условий (пустые списки статусов и приоритетов условий не добавляют)'''
+        return (
+            not self.status and not self.priority and self.due_from is None and self.due_to is None
+            and not self.overdue
+        )
+
+
+class TaskBatchItem(BaseModel):
+    '''Результат создания одной задачи из пакета'''
+    index: int = Field(..., description="Индекс задачи в запросе")
+    task: TaskOut | None = Field(None, description="Созданная задача")
+    errors: list[dict[str, Any]] | None = Field(None, description="Ошибки валидации")
+
+
+class TaskBatchOut(BaseModel):
+    '''Схема для возврата результата пакетного создания задач'''
+    created: int = Field(..., description="Количество созданных задач")
+    failed: int = Field(..., description="Количество задач с ошибками")
+    results: list[TaskBatchItem] = Field(..., description="Результаты по каждой задаче")
+
+
+class TaskSelection(BaseModel):
+    '''Схема выбора задач для массовых операций (по списку ID и/или фильтру)'''
+    ids: list[int] | None = Field(None, min_length=1, max_length=TASK_BATCH_MAX_SIZE, description="ID задач")
+    filter: TaskFilter | None = Field(None, description="Фильтр задач")
+
+    @model_validator(mode="after")
+    def validate_selection(self):
+        if self.ids is None and self.filter is None:
+            raise ValueError("Необходимо указать ids или filter")
+        # Пустой фильтр выбрал бы все задачи пользователя
+        if self.filter is not None and self.filter.is_empty():
+            raise ValueError("Фильтр должен содержать хотя бы одно условие")
+        return self
+
+
+class TaskBulkUpdate(TaskSelection):
+    '''Схема для массового обновления задач'''
+    changes: TaskUpdate = Field(..., description="Изменяемые поля")
+
+
+class TaskBulkResult(BaseModel):
+    '''Схема для возврата результата массовой операции'''
+    affected: int = Field(..., description="Количество затронутых задач")
+
+
+class TaskImportError(BaseModel):
+    '''Ошибка импорта строки'''
+    line: int = Field(..., description="Номер строки во входных данных")
+    errors: list[dict[str, Any]] = Field(..., description="Ошибки разбора или валидации")
+
+
+class TaskImportOut(BaseModel):
+    '''Схема для возврата результата импорта задач'''
+    processed: int = Field(..., description="Количество обработанных записей")
+    imported: int = Field(..., description="Количество загруженных задач")
+    failed: int = Field(..., description="Количество записей с ошибками")
+    errors: list[TaskImportError] = Field(..., description="Ошибки (не более TASK_IMPORT_MAX_ERRORS)")
+
+
+class TaskChangesOut(BaseModel):
+    '''Схема страницы ленты изменений задач'''
+    tasks: list[TaskOut] = Field(..., description="Измененные задачи (удаленные имеют is_active = False)")
+    cursor: str | None = Field(..., description="Курсор для следующего запроса ленты")
+    has_more: bool = Field(..., description="Есть ли еще изменения после курсора")
+
+
+class TaskArchiveOut(BaseModel):
+    '''Схема для возврата архивной задачи'''
+    id: int = Field(..., description="Уникальный идентификатор задачи")
+    title: str = Field(..., description="Заголовок задачи")
+    description: str | None = Field(None, description="Описание задачи")
+    status: TaskStatus = Field(..., description="Статус задачи")
+    priority: TaskPriority = Field(..., description="Приоритет выполнения задачи")
+    due_date: datetime | None = Field(None, description="Срок выполнения задачи")
+    user_id: int = Field(..., description="Уникальный идентификатор пользователя")
+    created_at: datetime = Field(..., description="Дата создания задачи")
+    updated_at: datetime | None = Field(..., description="Дата обновления (удаления) задачи")
+    archived_at: datetime = Field(..., description="Дата переноса задачи в архив")
+
+    model_config = ConfigDict(from_attributes=True)
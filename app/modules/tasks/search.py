@@ -0,0 +1,70 @@
+import re
+
+from sqlalchemy import DDL, Select, column, event, func, literal_column, select, table
+
+from .models import Task
+
+
+# PostgreSQL: генерируемая колонка tsvector и GIN-индекс по ней
+PG_SEARCH_DDL = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)",
+]
+
+# SQLite: теневая FTS5-таблица, синхронизируемая триггерами
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+SQLITE_SEARCH_DROP_DDL = ["DROP TABLE IF EXISTS tasks_fts"]
+
+tasks_fts = table("tasks_fts", column("rowid"), column("rank"))
+
+for statement in PG_SEARCH_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in SQLITE_SEARCH_DROP_DDL:
+    event.listen(Task.__table__, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def fts5_query(q: str) -> str:
+    '''
+    Преобразует пользовательский запрос в безопасный запрос FTS5: все слова, каждое в кавычках
+    '''
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def search_tasks_query(dialect_name: str, q: str) -> Select | None:
+    '''
+    Строит запрос полнотекстового поиска по title и description, отсортированный по релевантности.
+    Если в запросе нет слов, вернется None
+    '''
+    if dialect_name == "postgresql":
+        search_vector = literal_column("tasks.search_vector")
+        ts_query = func.websearch_to_tsquery(literal_column("'simple'"), q)
+        return (
+            select(Task)
+            .where(search_vector.op("@@")(ts_query))
+            .order_by(func.ts_rank(search_vector, ts_query).desc(), Task.id)
+        )
+
+    match = fts5_query(q)
+    if not match:
+        return None
+    return (
+        select(Task)
+        .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+        .where(literal_column("tasks_fts").op("MATCH")(match))
+        .order_by(tasks_fts.c.rank, Task.id)
+    )
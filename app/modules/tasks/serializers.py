@@ -0,0 +1,65 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from .enums import TaskStatus, TaskPriority
+
+
+class TaskRow(TypedDict):
+    '''Строка задачи из Core-запроса, поля в порядке схемы TaskOut'''
+    description: str | None
+    due_date: datetime | None
+    id: int
+    title: str
+    status: TaskStatus
+    priority: TaskPriority
+    user_id: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime | None
+
+
+TASK_ROW_FIELDS = tuple(TaskRow.__annotations__)
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    '''
+    Разбирает параметр fields ("id,title,status") в кортеж полей в порядке TaskRow.
+    Поле id включается всегда. Для неизвестных полей выбрасывается ValueError
+    '''
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(TASK_ROW_FIELDS)
+    if unknown:
+        raise ValueError(", ".join(sorted(unknown)))
+    requested.add("id")
+    return tuple(field for field in TASK_ROW_FIELDS if field in requested)
+
+
+@lru_cache(maxsize=128)
+def task_rows_adapter(fields: tuple[str, ...] = TASK_ROW_FIELDS, many: bool = True) -> TypeAdapter:
+    '''
+    Возвращает собранный один раз сериализатор для строк с указанным набором полей
+    '''
+    row_type = TaskRow
+    if fields != TASK_ROW_FIELDS:
+        row_type = TypedDict("TaskRowPart", {field: TaskRow.__annotations__[field] for field in fields})
+    return TypeAdapter(list[row_type] if many else row_type)
+
+
+def dump_task_rows(rows: list[dict[str, Any]], fields: tuple[str, ...] | None = None) -> bytes:
+    '''
+    Кодирует строки задач в JSON без создания моделей TaskOut (dump_json не выполняет валидацию)
+    '''
+    return task_rows_adapter(fields or TASK_ROW_FIELDS).dump_json(rows)
+
+
+def dump_task_row(row: dict[str, Any], fields: tuple[str, ...] | None = None) -> bytes:
+    '''
+    Кодирует одну строку задачи в JSON
+    '''
+    return task_rows_adapter(fields or TASK_ROW_FIELDS, many=False).dump_json(row)
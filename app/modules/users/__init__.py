@@ -1,6 +1,6 @@
 from .routers import users_router
-from .models import User
-from .schemas import UserIn, UserOut
+from .models import User, UserJob
+from .schemas import UserIn, UserOut, UserJobOut
 
 
 __all__ = [
@@ -9,8 +9,10 @@ __all__ = [
 
     # models
     "User",
+    "UserJob",
 
     # schemas
     "UserIn",
-    "UserOut"
+    "UserOut",
+    "UserJobOut"
 ]
@@ -1,10 +1,24 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timedelta
+from uuid import uuid4
 
-from .models import User
+from .models import User, UserJob
 from .schemas import UserIn
-from app.modules.tasks.crud import Task
-from app.core.security import hash_password
+from .enums import UserJobAction, UserJobStatus
+from app.modules.tasks.crud import Task, allocate_change_seq
+from app.modules.tasks.cache import task_cache
+from app.modules.tasks.events import publish_task_event
+from app.modules.tasks.enums import TaskEventType
+from app.core.security import hash_password_async
+from app.core.cache import principal_cache
+from app.core.revocation import revoke_user_tokens, restore_user_tokens
+from app.core.config import USER_CASCADE_CHUNK_SIZE, USER_JOB_STALE_SECONDS, USER_JOB_MAX_ATTEMPTS
+
+
+# Задания, которые нужно выполнить или продолжить (failed - прерванные ошибкой)
+UNFINISHED_JOB_STATUSES = (UserJobStatus.PENDING, UserJobStatus.RUNNING, UserJobStatus.FAILED)
 
 
 class UserCrud:
@@ -21,18 +35,24 @@ class UserCrud:
         )
         return db_user
 
-    async def create_user(self, user: UserIn) -> User:
+    async def create_user(self, user: UserIn) -> User | None:
         '''
-        Создает нового пользователя и хеширует его пароль для хранения в базе данных
+        Создает нового пользователя и хеширует его пароль для хранения в базе данных.
+        Вставка выполняется одним запросом (INSERT ... ON CONFLICT DO NOTHING RETURNING),
+        если почта уже зарегистрирована, вернется None
         '''
-        new_user = User(
-            name=user.name,
-            email=user.email,
-            hashed_password=hash_password(user.password)
+        dialect_insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        new_user = await self.db.scalar(
+            dialect_insert(User)
+            .values(
+                name=user.name,
+                email=user.email,
+                hashed_password=await hash_password_async(user.password)
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
         )
-        self.db.add(new_user)
         await self.db.commit()
-        await self.db.refresh(new_user)
         return new_user
 
     async def check_user_email(self, email: str) -> User | None:
@@ -45,32 +65,182 @@ class UserCrud:
         )
         return user_email
 
-    async def delete_user(self, user_id: int) -> None:
+    async def delete_user(self, user_id: int) -> UserJob:
         '''
-        Выполняет мягкое удаление пользователя с указанным ID и всех его задач(is_active = False)
+        Выполняет мягкое удаление пользователя с указанным ID (is_active = False).
+        Задачи пользователя деактивируются фоновым заданием (run_job), которое возвращается
         '''
         await self.db.execute(
             update(User)
             .where(User.id == user_id)
             .values(is_active=False)
         )
-        await self.db.execute(
-            update(Task)
-            .where(Task.user_id == user_id)
-            .values(is_active=False)
-        )
+        job = await self._create_job(user_id, UserJobAction.DEACTIVATE_TASKS)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
+        await revoke_user_tokens(user_id)
+        return job
 
-    async def restore_user(self, user_id: int) -> User:
+    async def restore_user(self, user_id: int) -> tuple[User, UserJob]:
         '''
-        Восстановление удаленного пользователя (is_active = True)
+        Восстановление удаленного пользователя (is_active = True).
+        Задачи, деактивированные вместе с пользователем (изменены не раньше его удаления),
+        восстанавливаются фоновым заданием (run_job), которое возвращается вместе с пользователем
         '''
         restored_user = await self.db.get(User, user_id)
+        # Момент удаления пользователя: задачи, удаленные раньше, остаются удаленными
+        deleted_at = restored_user.updated_at or restored_user.created_at
         await self.db.execute(
             update(User)
             .where(User.id == user_id)
             .values(is_active=True)
         )
+        job = await self._create_job(user_id, UserJobAction.RESTORE_TASKS, deleted_at)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
+        await restore_user_tokens(user_id)
         await self.db.refresh(restored_user)
-        return restored_user
+        return restored_user, job
+
+    async def get_deleted_users(self, since: datetime) -> list[tuple[int, datetime]]:
+        '''
+        Возвращает ID и момент удаления пользователей, удаленных не раньше since
+        '''
+        rows = await self.db.execute(
+            select(User.id, User.updated_at)
+            .where(User.is_active.is_(False), User.updated_at >= since)
+        )
+        return rows.tuples().all()
+
+    async def get_job(self, job_id: int) -> UserJob | None:
+        '''
+        Возвращает фоновое задание с указанным ID, если такого задания нет, вернется None
+        '''
+        return await self.db.get(UserJob, job_id, populate_existing=True)
+
+    async def get_unfinished_job_ids(self) -> list[int]:
+        '''
+        Возвращает ID заданий, которые не были завершены (в том числе прерванных сбоем),
+        кроме исчерпавших попытки
+        '''
+        job_ids = await self.db.scalars(
+            select(UserJob.id)
+            .where(UserJob.status.in_(UNFINISHED_JOB_STATUSES), UserJob.attempts < USER_JOB_MAX_ATTEMPTS)
+            .order_by(UserJob.id)
+        )
+        return job_ids.all()
+
+    async def claim_job(
+            self, job_id: int, owner: str, stale_after: timedelta = timedelta(seconds=USER_JOB_STALE_SECONDS)
+    ) -> UserJob | None:
+        '''
+        Атомарно захватывает задание одним UPDATE ... RETURNING: ожидающее, прерванное ошибкой
+        или выполняемое, но без heartbeat дольше stale_after (процесс-исполнитель пропал).
+        Если задание выполняется другим процессом, отменено, завершено или исчерпало попытки, вернется None
+        '''
+        now = datetime.now()
+        job = await self.db.scalar(
+            update(UserJob)
+            .where(
+                UserJob.id == job_id,
+                UserJob.status.in_(UNFINISHED_JOB_STATUSES),
+                UserJob.attempts < USER_JOB_MAX_ATTEMPTS,
+                or_(
+                    UserJob.status != UserJobStatus.RUNNING,
+                    UserJob.heartbeat_at.is_(None),
+                    UserJob.heartbeat_at < now - stale_after
+                )
+            )
+            .values(status=UserJobStatus.RUNNING, owner=owner, heartbeat_at=now, attempts=UserJob.attempts + 1)
+            .returning(UserJob)
+            .execution_options(populate_existing=True)
+        )
+        await self.db.commit()
+        return job
+
+    async def run_job(self, job_id: int, chunk_size: int = USER_CASCADE_CHUNK_SIZE) -> None:
+        '''
+        Захватывает и выполняет (или продолжает) задание порциями по chunk_size задач в диапазонах ID.
+        Каждая порция, прогресс и heartbeat задания фиксируются одной транзакцией.
+        Задание останавливается, если его отменило более новое задание того же пользователя
+        или захватил другой процесс
+        '''
+        owner = uuid4().hex
+        job = await self.claim_job(job_id, owner)
+        if job is None:
+            return
+        user_id, last_task_id, max_task_id = job.user_id, job.last_task_id, job.max_task_id
+        if job.action == UserJobAction.DEACTIVATE_TASKS:
+            conditions = [Task.is_active.is_(True)]
+            values, event_type = {"is_active": False}, TaskEventType.DELETED
+        else:
+            conditions = [Task.is_active.is_(False), Task.updated_at >= job.since]
+            values, event_type = {"is_active": True}, TaskEventType.UPDATED
+
+        try:
+            while max_task_id is not None and last_task_id < max_task_id:
+                # Граница порции - chunk_size-я задача пользователя после last_task_id (индекс ix_tasks_user_id)
+                upper_id = await self.db.scalar(
+                    select(Task.id)
+                    .where(Task.user_id == user_id, Task.id > last_task_id, Task.id <= max_task_id)
+                    .order_by(Task.id)
+                    .offset(chunk_size - 1)
+                    .limit(1)
+                )
+                if upper_id is None:
+                    upper_id = max_task_id
+                task_ids = (await self.db.scalars(
+                    update(Task)
+                    .where(Task.user_id == user_id, Task.id > last_task_id, Task.id <= upper_id, *conditions)
+                    .values(**values, change_seq=await allocate_change_seq(self.db, user_id))
+                    .returning(Task.id)
+                )).all()
+                if not await self._update_job(
+                    job_id, owner, last_task_id=upper_id, processed=UserJob.processed + len(task_ids)
+                ):
+                    await self.db.rollback()
+                    return
+                await self.db.commit()
+                last_task_id = upper_id
+                if task_ids:
+                    await task_cache.invalidate_user(user_id)
+                    await publish_task_event(user_id, event_type, task_ids)
+
+            await self._update_job(job_id, owner, status=UserJobStatus.COMPLETED)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            await self._update_job(job_id, owner, status=UserJobStatus.FAILED)
+            await self.db.commit()
+            raise
+
+    async def _create_job(self, user_id: int, action: UserJobAction, since: datetime | None = None) -> UserJob:
+        # Незавершенные задания пользователя теряют смысл после нового удаления или восстановления
+        await self.db.execute(
+            update(UserJob)
+            .where(UserJob.user_id == user_id, UserJob.status.in_(UNFINISHED_JOB_STATUSES))
+            .values(status=UserJobStatus.CANCELLED)
+        )
+        max_task_id = await self.db.scalar(select(func.max(Task.id)).where(Task.user_id == user_id))
+        job = await self.db.scalar(
+            insert(UserJob)
+            .values(
+                user_id=user_id, action=action, since=since, max_task_id=max_task_id,
+                status=UserJobStatus.PENDING if max_task_id is not None else UserJobStatus.COMPLETED
+            )
+            .returning(UserJob)
+        )
+        return job
+
+    async def _update_job(self, job_id: int, owner: str, **values) -> bool:
+        '''
+        Обновляет выполняемое процессом owner задание и его heartbeat.
+        Возвращает False, если задание отменено, завершено или захвачено другим процессом
+        '''
+        updated_id = await self.db.scalar(
+            update(UserJob)
+            .where(UserJob.id == job_id, UserJob.owner == owner, UserJob.status == UserJobStatus.RUNNING)
+            .values(heartbeat_at=datetime.now(), **values)
+            .returning(UserJob.id)
+        )
+        return updated_id is not None
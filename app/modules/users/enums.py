@@ -0,0 +1,14 @@
+import enum
+
+
+class UserJobAction(str, enum.Enum):
+    DEACTIVATE_TASKS = "deactivate_tasks"
+    RESTORE_TASKS = "restore_tasks"
+
+
+class UserJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
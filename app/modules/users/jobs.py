@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .crud import UserCrud
+from app.core.database import async_session_maker
+from app.core.config import USER_JOB_STALE_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run_user_job(session_maker: async_sessionmaker[AsyncSession], job_id: int) -> None:
+    '''
+    Выполняет задание пользователя в собственной сессии: фоновая задача запроса
+    запускается уже после закрытия сессии запроса
+    '''
+    async with session_maker() as session:
+        try:
+            await UserCrud(session).run_job(job_id)
+        except Exception:
+            logger.exception("Не удалось выполнить задание пользователя %s", job_id)
+
+
+async def resume_user_jobs(session_maker: async_sessionmaker[AsyncSession] = async_session_maker) -> None:
+    '''
+    Продолжает задания пользователей, прерванные остановкой или сбоем приложения.
+    Задания, которые выполняет другой процесс, пропускаются (см. UserCrud.claim_job)
+    '''
+    async with session_maker() as session:
+        job_ids = await UserCrud(session).get_unfinished_job_ids()
+    for job_id in job_ids:
+        await run_user_job(session_maker, job_id)
+
+
+async def resume_user_jobs_periodically(interval: float = USER_JOB_STALE_SECONDS) -> None:
+    '''
+    Периодически продолжает брошенные задания (запускается из lifespan приложения): задание,
+    прерванное остановкой другого процесса, становится доступным после устаревания его heartbeat
+    '''
+    while True:
+        try:
+            await resume_user_jobs()
+        except Exception:
+            logger.exception("Ошибка проверки незавершенных заданий пользователей")
+        await asyncio.sleep(interval)
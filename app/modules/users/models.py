@@ -1,8 +1,9 @@
-from sqlalchemy import String, DateTime
+from sqlalchemy import BigInteger, String, DateTime, Enum, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
 from app.core.database import Base
+from .enums import UserJobAction, UserJobStatus
 
 
 class User(Base):
@@ -15,5 +16,31 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now, nullable=False)
     updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None, onupdate=datetime.now)
+    # Счетчик изменений задач пользователя (см. allocate_change_seq)
+    task_change_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
 
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
+
+
+class UserJob(Base):
+    '''
+    Фоновая обработка задач пользователя порциями по диапазонам ID (каскадное удаление и восстановление).
+    Прогресс (last_task_id) сохраняется вместе с каждой порцией, поэтому задание можно продолжить после сбоя.
+    Выполняющий процесс (owner) захватывает задание атомарно и обновляет heartbeat_at с каждой порцией;
+    attempts ограничивает повторные запуски
+    '''
+    __tablename__ = "user_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    action: Mapped['UserJobAction'] = mapped_column(Enum(UserJobAction), nullable=False)
+    status: Mapped['UserJobStatus'] = mapped_column(Enum(UserJobStatus), default=UserJobStatus.PENDING, nullable=False)
+    since: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    last_task_id: Mapped[int] = mapped_column(default=0, nullable=False)
+    max_task_id: Mapped[int | None] = mapped_column(default=None)
+    processed: Mapped[int] = mapped_column(default=0, nullable=False)
+    owner: Mapped[str | None] = mapped_column(String(64), default=None)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now, nullable=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None, onupdate=datetime.now)
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Hashable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .crud import UserCrud
+from app.core.database import async_session_maker
+from app.core.events import RESYNC_EVENT
+from app.core.revocation import revocation_list
+
+
+logger = logging.getLogger(__name__)
+
+# Фоновые перезагрузки списка отзыва (ссылки хранятся, чтобы задачи не собрал сборщик мусора)
+_reloads: set[asyncio.Task] = set()
+
+
+async def load_revocations(session_maker: async_sessionmaker[AsyncSession] = async_session_maker) -> None:
+    '''
+    Загружает список отзыва из базы: пользователи, удаленные в пределах срока жизни токена.
+    Вызывается при запуске процесса и после пересинхронизации auth_events,
+    так как события отзыва, опубликованные до этого, процесс мог не получить
+    '''
+    since = datetime.now() - timedelta(seconds=revocation_list.ttl_seconds)
+    async with session_maker() as session:
+        deleted_users = await UserCrud(session).get_deleted_users(since)
+    revocation_list.load({user_id: deleted_at.timestamp() for user_id, deleted_at in deleted_users})
+    logger.info("Загружен список отзыва токенов: %d пользователей", len(revocation_list))
+
+
+async def _reload_revocations() -> None:
+    try:
+        await load_revocations()
+    except Exception:
+        logger.exception("Не удалось перезагрузить список отзыва токенов")
+
+
+def reload_on_resync(key: Hashable, event: dict[str, Any]) -> None:
+    '''
+    Обработчик auth_events: после потери событий транспортом перечитывает список отзыва из базы
+    '''
+    if key is None and event["type"] == RESYNC_EVENT["type"]:
+        task = asyncio.create_task(_reload_revocations())
+        _reloads.add(task)
+        task.add_done_callback(_reloads.discard)
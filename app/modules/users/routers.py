@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
 from typing import Annotated
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from .crud import UserCrud
-from .schemas import UserIn, UserOut
-from app.core.dependencies import get_user_crud
-from app.core.security import verify_password
+from .jobs import run_user_job
+from .schemas import UserIn, UserOut, UserJobOut
+from app.core.dependencies import get_user_crud, get_session_maker
+from app.core.security import verify_password_async
 from app.core.auth import create_access_token
 
 
 users_router = APIRouter()
 
 
+def job_location(job_id: int) -> str:
+    return f"/api/users/jobs/{job_id}"
+
+
 @users_router.get('/{user_id}', response_model=UserOut, status_code=status.HTTP_200_OK)
 async def get_user(user_id: int, user_crud: Annotated[UserCrud, Depends(get_user_crud)]):
     '''
@@ -31,13 +37,12 @@ async def create_user(user: UserIn, user_crud: Annotated[UserCrud, Depends(get_u
     '''
     Создание нового пользователя с проверкой на уникальность почты
     '''
-    if await user_crud.check_user_email(user.email):
+    new_user = await user_crud.create_user(user)
+    if not new_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Email {user.email} уже зарегистрирован"
         )
-
-    new_user = await user_crud.create_user(user)
     return new_user
 
 
@@ -50,20 +55,39 @@ async def login(
     Аутентифицирует пользователя и возвращает JWT с email и id.
     """
     user = await user_crud.check_user_email(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный адрес электронной почты или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email, "id": user.id})
+    access_token = create_access_token(data={"sub": user.email, "id": user.id, "is_active": user.is_active})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@users_router.get('/jobs/{job_id}', response_model=UserJobOut, status_code=status.HTTP_200_OK)
+async def get_user_job(job_id: int, user_crud: Annotated[UserCrud, Depends(get_user_crud)]):
+    '''
+    Состояние фонового задания удаления или восстановления задач пользователя
+    '''
+    job = await user_crud.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Задание с ID: {job_id} не найдено"
+        )
+    return job
+
+
 @users_router.patch('/restore/{user_id}', response_model=UserOut, status_code=status.HTTP_200_OK)
-async def restore_user(user_id: int, user_crud: Annotated[UserCrud, Depends(get_user_crud)]):
+async def restore_user(
+    user_id: int, response: Response, background_tasks: BackgroundTasks,
+    user_crud: Annotated[UserCrud, Depends(get_user_crud)],
+    session_maker: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_maker)]
+):
     '''
-    Восстановление удаленного пользователя
+    Восстановление удаленного пользователя.
+    Его задачи восстанавливаются в фоне, адрес задания передается в заголовке Location
     '''
     db_user = await user_crud.get_user(user_id, active=False)
     if not db_user:
@@ -71,14 +95,22 @@ async def restore_user(user_id: int, user_crud: Annotated[UserCrud, Depends(get_
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Удаленный пользователь с ID: {user_id} не найден"
         )
-    restored_user = await user_crud.restore_user(user_id)
+    restored_user, job = await user_crud.restore_user(user_id)
+    background_tasks.add_task(run_user_job, session_maker, job.id)
+    response.headers["Location"] = job_location(job.id)
     return restored_user
 
 
 @users_router.delete('/{user_id}', status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, user_crud: Annotated[UserCrud, Depends(get_user_crud)]):
+async def delete_user(
+    user_id: int, response: Response, background_tasks: BackgroundTasks,
+    user_crud: Annotated[UserCrud, Depends(get_user_crud)],
+    session_maker: Annotated[async_sessionmaker[AsyncSession], Depends(get_session_maker)]
+):
     '''
-    Мягкое удаление пользователя с указанным ID
+    Мягкое удаление пользователя с указанным ID.
+    Ответ возвращается сразу, задачи пользователя деактивируются в фоне порциями,
+    адрес задания передается в заголовке Location
     '''
     db_user = await user_crud.get_user(user_id)
     if not db_user:
@@ -86,4 +118,6 @@ async def delete_user(user_id: int, user_crud: Annotated[UserCrud, Depends(get_u
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Пользователь с ID: {user_id} не найден"
         )
-    await user_crud.delete_user(user_id)
+    job = await user_crud.delete_user(user_id)
+    background_tasks.add_task(run_user_job, session_maker, job.id)
+    response.headers["Location"] = job_location(job.id)
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from datetime import datetime
 
+from .enums import UserJobAction, UserJobStatus
+
 
 class UserBase(BaseModel):
     '''Базовая схема пользователя'''
@@ -21,3 +23,19 @@ class UserOut(UserBase):
     updated_at: datetime | None = Field(default=None, description="Дата изменения пользователя")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserJobOut(BaseModel):
+    '''Схема для возврата состояния фонового задания пользователя'''
+    id: int = Field(..., description="Уникальный идентификатор задания")
+    user_id: int = Field(..., description="Уникальный идентификатор пользователя")
+    action: UserJobAction = Field(..., description="Действие над задачами пользователя")
+    status: UserJobStatus = Field(..., description="Состояние задания")
+    processed: int = Field(..., description="Количество обработанных задач")
+    last_task_id: int = Field(..., description="ID задачи, до которой выполнена обработка")
+    max_task_id: int | None = Field(..., description="Последний ID задачи пользователя на момент создания задания")
+    attempts: int = Field(..., description="Количество запусков задания")
+    created_at: datetime = Field(..., description="Дата создания задания")
+    updated_at: datetime | None = Field(..., description="Дата последнего изменения задания")
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,63 @@
+"""
+Микробенчмарк сериализации списка задач: путь через ORM и TaskOut против dump_task_rows.
+
+Запуск: python -m benchmarks.serialization --rows 1000 --repeat 200
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.main import app  # noqa: F401 — регистрирует все модели
+from app.modules.tasks.enums import TaskPriority, TaskStatus
+from app.modules.tasks.models import Task
+from app.modules.tasks.schemas import TaskOut
+from app.modules.tasks.serializers import dump_task_rows
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now()
+    return [
+        {
+            "description": f"Описание задачи {i} " * 5,
+            "due_date": now + timedelta(days=i % 30) if i % 3 else None,
+            "id": i,
+            "title": f"Задача {i}",
+            "status": TaskStatus.PENDING if i % 2 else TaskStatus.COMPLETED,
+            "priority": list(TaskPriority)[i % 3],
+            "user_id": 1,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now if i % 4 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    tasks = [Task(**row) for row in rows]
+    response_adapter = TypeAdapter(list[TaskOut])
+
+    def orm_path() -> bytes:
+        # Как FastAPI обрабатывает response_model=list[TaskOut]: валидация from_attributes + JSONResponse
+        validated = response_adapter.validate_python(tasks, from_attributes=True)
+        return JSONResponse(response_adapter.dump_python(validated, mode="json")).body
+
+    def rows_path() -> bytes:
+        return dump_task_rows(rows)
+
+    for name, func in (("orm + TaskOut", orm_path), ("rows + dump_json", rows_path)):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<18} {seconds * 1000:8.3f} мс на {args.rows} строк")
+
+
+if __name__ == "__main__":
+    main()
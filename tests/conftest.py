@@ -1,27 +1,65 @@
+from contextlib import contextmanager
+
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.core.database import Base
-from app.core.dependencies import get_async_db
+from app.core.dependencies import get_async_db, get_session_maker
 from app.core.security import hash_password
 from app.core.config import TEST_DATABASE_URL
+from app.core.metrics import instrument_engine, QueryCounter
+from app.core.cache import principal_cache
+from app.core.revocation import revocation_list
+from app.modules.tasks.cache import task_cache
 from app.modules.users.models import User
 from app.modules.tasks.models import Task
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Очищает кеши между тестами"""
+    principal_cache.clear()
+    revocation_list.clear()
+    task_cache.clear()
+    yield
+    principal_cache.clear()
+    revocation_list.clear()
+    task_cache.clear()
+
+
 @pytest_asyncio.fixture
 async def test_engine():
     """Создает engine и БД для теста"""
     engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True)
+    instrument_engine(engine, "test")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield engine
     await engine.dispose()
 
 
+@pytest.fixture
+def query_budget(test_engine):
+    """
+    Проверяет, что блок выполняет не больше max_queries SQL-запросов:
+    with query_budget(2): await client.get(...)
+    """
+
+    @contextmanager
+    def budget(max_queries: int):
+        with QueryCounter(test_engine) as counter:
+            yield counter
+        assert counter.count <= max_queries, (
+            f"Выполнено запросов: {counter.count}, бюджет: {max_queries}\n" + "\n".join(counter.statements)
+        )
+
+    return budget
+
+
 @pytest_asyncio.fixture
 async def db_session(test_engine):
     """Создает сессию для теста"""
@@ -31,7 +69,7 @@ async def db_session(test_engine):
 
 
 @pytest_asyncio.fixture
-async def client(db_session):
+async def client(db_session, test_engine):
     """Создает клиент с существующей сессией"""
 
     async def _get_async_db_override():
@@ -41,6 +79,10 @@ async def client(db_session):
             await db_session.close()
 
     app.dependency_overrides[get_async_db] = _get_async_db_override
+    # Фоновые задачи запроса работают с тестовой базой в собственных сессиях
+    app.dependency_overrides[get_session_maker] = lambda: async_sessionmaker(
+        test_engine, class_=AsyncSession, expire_on_commit=False
+    )
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://testserver") as client:
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.modules.tasks.models import Task, TaskArchive
+from app.modules.tasks.crud import TaskCrud
+from app.modules.tasks.archive import archive_tasks
+from app.modules.users.models import User
+from app.core.security import hash_password
+
+
+OLD = datetime.now() - timedelta(days=40)
+
+
+async def test_archive_tasks(authenticated_client_with_tasks, test_user_with_tasks, db_session):
+    deleted_user = User(name="User_3", email="user_3@example.com", hashed_password=hash_password("12345678"))
+    db_session.add_all([
+        Task(title="old_1", user=test_user_with_tasks, is_active=False, updated_at=OLD),
+        Task(title="old_2", user=test_user_with_tasks, is_active=False, updated_at=OLD),
+        Task(title="recent", user=test_user_with_tasks, is_active=False, updated_at=datetime.now()),
+        Task(title="old_active", user=test_user_with_tasks, created_at=OLD),
+        Task(title="deleted_user", user=deleted_user, is_active=False, updated_at=OLD),
+    ])
+    deleted_user.is_active = False
+    await db_session.commit()
+
+    progress = []
+    archived = await archive_tasks(
+        TaskCrud(db_session), timedelta(days=30), batch_size=1, delay=0, progress=progress.append
+    )
+    assert archived == 2
+    assert progress == [1, 2, 2]
+
+    remaining = (await db_session.scalars(select(Task.title).order_by(Task.id))).all()
+    assert remaining == ["Task_1", "Task_2", "recent", "old_active", "deleted_user"]
+    archive = (await db_session.scalars(select(TaskArchive).order_by(TaskArchive.id))).all()
+    assert [task.title for task in archive] == ["old_1", "old_2"]
+    assert all(task.archived_at is not None for task in archive)
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/archive")
+    assert res.status_code == 200
+    tasks = res.json()
+    assert [task["title"] for task in tasks] == ["old_1", "old_2"]
+    assert tasks[0]["user_id"] == test_user_with_tasks.id
+
+    # Архивные задачи остаются в ленте изменений как удаленные
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes")
+    assert res.status_code == 200
+    changes = {task["title"]: task["is_active"] for task in res.json()["tasks"]}
+    assert changes["old_1"] is False and changes["old_2"] is False
+    assert changes["Task_1"] is True
+
+
+async def test_archive_tasks_max_batches(test_user_with_tasks, db_session):
+    db_session.add_all([
+        Task(title=f"old_{i}", user=test_user_with_tasks, is_active=False, updated_at=OLD) for i in range(3)
+    ])
+    await db_session.commit()
+
+    assert await archive_tasks(TaskCrud(db_session), timedelta(days=30), batch_size=1, delay=0, max_batches=2) == 2
+    assert await archive_tasks(TaskCrud(db_session), timedelta(days=30), batch_size=2, delay=0) == 1
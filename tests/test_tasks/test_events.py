@@ -0,0 +1,97 @@
+import json
+
+from app.core.events import EventHub, MemoryEventBackend, RESYNC_EVENT, NOTIFY_PAYLOAD_LIMIT, notify_payloads
+from app.modules.tasks.events import task_events, task_event_stream
+
+
+async def test_hub_delivers_to_channel_subscribers():
+    hub = EventHub(MemoryEventBackend(), queue_size=10)
+    async with hub.subscribe(1) as first, hub.subscribe(2) as second:
+        await hub.publish(1, {"type": "created", "task_ids": [1]})
+        assert await first.get(0.1) == {"type": "created", "task_ids": [1]}
+        assert await second.get(0.01) is None
+        assert hub.stats()["subscriptions"] == 2
+    assert hub.stats()["subscriptions"] == 0
+    assert hub.subscribers == {}
+
+
+async def test_hub_slow_subscriber_overflow():
+    hub = EventHub(MemoryEventBackend(), queue_size=2)
+    async with hub.subscribe(1) as slow, hub.subscribe(1) as fast:
+        for task_id in range(3):
+            await hub.publish(1, {"type": "updated", "task_ids": [task_id]})
+            await fast.get(0.1)
+
+    assert slow.overflowed is True
+    assert slow.queue.empty()
+    assert fast.overflowed is False
+    assert hub.stats()["dropped"] == 1
+
+
+async def test_task_event_stream():
+    stream = task_event_stream(42, heartbeat=0.01)
+    assert await anext(stream) == ": connected\n\n"
+    assert await anext(stream) == ": ping\n\n"
+
+    await task_events.publish(42, {"type": "deleted", "task_ids": [7]})
+    assert await anext(stream) == 'event: deleted\ndata: {"type":"deleted","task_ids":[7]}\n\n'
+    await stream.aclose()
+    assert 42 not in task_events.subscribers
+
+
+async def test_task_event_stream_resync_on_overflow():
+    stream = task_event_stream(42, heartbeat=0.01)
+    await anext(stream)
+    for task_id in range(task_events.queue_size + 1):
+        await task_events.publish(42, {"type": "created", "task_ids": [task_id]})
+
+    assert await anext(stream) == "event: resync\ndata: {}\n\n"
+    assert [chunk async for chunk in stream] == []
+    assert 42 not in task_events.subscribers
+
+
+async def test_task_writes_publish_events(authenticated_client_with_tasks, test_user_with_tasks, db_session):
+    await db_session.commit()
+    async with task_events.subscribe(test_user_with_tasks.id) as subscription:
+        res = await authenticated_client_with_tasks.post("/api/tasks/", json={"title": "Task_3"})
+        task_id = res.json()["id"]
+        await authenticated_client_with_tasks.patch(f"/api/tasks/{task_id}", json={"title": "new title"})
+        await authenticated_client_with_tasks.delete(f"/api/tasks/{task_id}")
+        await authenticated_client_with_tasks.post("/api/tasks/bulk/delete", json={"filter": {"status": ["pending"]}})
+
+        events = [await subscription.get(0.1) for _ in range(4)]
+    assert events[:3] == [
+        {"type": "created", "task_ids": [task_id]},
+        {"type": "updated", "task_ids": [task_id]},
+        {"type": "deleted", "task_ids": [task_id]},
+    ]
+    assert events[3]["type"] == "deleted"
+    assert len(events[3]["task_ids"]) == 2
+
+
+async def test_task_events_unauthorized(client):
+    res = await client.get("/api/tasks/events")
+    assert res.status_code == 401
+
+
+def test_notify_payloads_split_large_events():
+    task_ids = list(range(1_000_000, 1_002_000))
+    payloads = notify_payloads(7, {"type": "deleted", "task_ids": task_ids})
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) < NOTIFY_PAYLOAD_LIMIT for payload in payloads)
+    messages = [json.loads(payload) for payload in payloads]
+    assert {message["key"] for message in messages} == {7}
+    assert [task_id for message in messages for task_id in message["event"]["task_ids"]] == task_ids
+
+
+async def test_hub_reset_requires_resync():
+    hub = EventHub(MemoryEventBackend(), queue_size=10)
+    received = []
+    hub.add_listener(lambda key, event: received.append((key, event)))
+    async with hub.subscribe(1) as subscription:
+        await hub.publish(1, {"type": "created", "task_ids": [1]})
+        hub.reset()
+        assert subscription.overflowed is True
+        assert subscription.queue.empty()
+    assert received[-1] == (None, RESYNC_EVENT)
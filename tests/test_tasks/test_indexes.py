@@ -0,0 +1,93 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func, select
+from sqlalchemy.dialects import sqlite
+
+from app.modules.tasks.models import Task
+from app.modules.tasks.enums import TaskStatus, TaskSort
+from app.modules.tasks.search import search_tasks_query
+from app.modules.tasks.crud import task_changes_query, user_tasks_page_query, CHANGES_CURSOR_TAG, TASK_FIELDS
+from app.modules.tasks.schemas import TaskFilter
+from app.modules.tasks.pagination import encode_cursor
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """Применяет все миграции к временной SQLite-базе"""
+    db_path = tmp_path / "migrated.db"
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", f"sqlite+aiosqlite:///{db_path}")
+    command.upgrade(config, "head")
+
+    connection = sqlite3.connect(db_path)
+    yield connection
+    connection.close()
+
+
+def explain(connection: sqlite3.Connection, query) -> str:
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return " ".join(row[-1] for row in rows)
+
+
+def test_user_tasks_use_index(migrated_db):
+    plan = explain(
+        migrated_db,
+        select(Task)
+        .where(Task.user_id == 1, Task.is_active.is_(True))
+        .order_by(Task.created_at, Task.id)
+    )
+    assert "USING INDEX ix_tasks_user_active_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_user_tasks_by_status_use_index(migrated_db):
+    plan = explain(
+        migrated_db,
+        select(Task)
+        .where(Task.user_id == 1, Task.is_active.is_(True), Task.status == TaskStatus.COMPLETED)
+    )
+    assert "USING INDEX ix_tasks_user_active_status" in plan
+
+
+def test_due_tasks_use_index(migrated_db):
+    plan = explain(
+        migrated_db,
+        select(Task.id)
+        .where(Task.is_active.is_(True), Task.due_date.is_not(None), Task.due_date < "2030-01-01")
+        .order_by(Task.due_date)
+    )
+    assert "ix_tasks_active_due_date" in plan
+
+
+def test_user_tasks_due_range_use_index(migrated_db):
+    filters = TaskFilter(due_from=datetime(2030, 1, 1), due_to=datetime(2030, 2, 1))
+    plan = explain(migrated_db, user_tasks_page_query(1, 101, None, 0, filters, TaskSort.DUE_DATE, TASK_FIELDS))
+    assert "USING INDEX ix_tasks_user_active_due" in plan
+    assert "due_date>? AND due_date<?" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_user_tasks_due_sort_use_index(migrated_db):
+    cursor = encode_cursor([False, "2030-01-01T00:00:00", 5], TaskSort.DUE_DATE.value)
+    plan = explain(migrated_db, user_tasks_page_query(1, 101, cursor, 0, None, TaskSort.DUE_DATE, TASK_FIELDS))
+    assert "USING INDEX ix_tasks_user_active_due" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_search_uses_fts_index(migrated_db):
+    plan = explain(migrated_db, search_tasks_query("sqlite", "молоко").where(Task.user_id == 1))
+    assert "VIRTUAL TABLE INDEX" in plan
+    assert "SEARCH tasks USING INTEGER PRIMARY KEY" in plan
+
+
+def test_task_changes_use_index(migrated_db):
+    plan = explain(migrated_db, task_changes_query(1, encode_cursor([10, 5], CHANGES_CURSOR_TAG), 100))
+    assert "USING INDEX ix_tasks_user_change_seq" in plan
+    assert "USING INDEX ix_tasks_archive_user_change_seq" in plan
+    # Сортируется только объединение двух ограниченных частей
+    assert plan.count("TEMP B-TREE") == 1
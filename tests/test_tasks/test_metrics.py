@@ -0,0 +1,76 @@
+import asyncio
+
+from app.core.metrics import (
+    Histogram, MetricsMiddleware, http_requests, http_latency, http_db_queries, request_stats
+)
+
+
+def test_histogram_render():
+    histogram = Histogram("test_seconds", "Тест", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, ("/a",))
+
+    assert list(histogram.render()) == [
+        "# HELP test_seconds Тест",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 2',
+        'test_seconds_bucket{route="/a",le="1.0"} 3',
+        'test_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_seconds_sum{route="/a"} 3.65',
+        'test_seconds_count{route="/a"} 4',
+    ]
+
+
+async def test_metrics_endpoint(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+    labels = ("GET", "/api/tasks/{task_id}")
+    requests_before = http_requests.values.get(labels + (404,), 0)
+    queries_before = http_db_queries.values.get(labels, [[], 0.0])[1]
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/100")
+    assert res.status_code == 404
+
+    assert http_requests.values[labels + (404,)] == requests_before + 1
+    # Пользователь и задача читаются из базы
+    assert http_db_queries.values[labels][1] >= queries_before + 2
+
+    res = await authenticated_client_with_tasks.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+    assert 'http_requests_total{method="GET",route="/api/tasks/{task_id}",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/tasks/{task_id}",le="+Inf"}' in body
+    assert "db_query_duration_seconds_count" in body
+    assert "db_pool_checkout_seconds_count" in body
+    # Ряды пула тестового engine не подменяют ряды engine приложения
+    assert 'db_pool_connections_in_use{engine="app"}' in body
+    assert 'db_pool_connections_in_use{engine="test"}' in body
+    assert 'db_queries_total{engine="test"}' in body
+
+
+async def test_metrics_middleware_excludes_background_work():
+    after_response = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+        # Работа после ответа, как у BackgroundTasks: не входит во время и запросы к базе
+        after_response.append(request_stats.get().closed)
+        await asyncio.sleep(0.2)
+
+    async def send(message):
+        pass
+
+    labels = ("POST", "unmatched")
+    before = http_latency.values.get(labels, [[], 0.0])[1]
+    await MetricsMiddleware(app)({"type": "http", "method": "POST"}, None, send)
+
+    assert after_response == [True]
+    assert http_latency.values[labels][1] - before < 0.2
+
+
+async def test_metrics_unmatched_route(client):
+    before = http_requests.values.get(("GET", "unmatched", 404), 0)
+    res = await client.get("/api/unknown/1")
+    assert res.status_code == 404
+    assert http_requests.values[("GET", "unmatched", 404)] == before + 1
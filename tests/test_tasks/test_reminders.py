@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.modules.tasks.models import Task
+from app.modules.tasks.schemas import TaskIn
+from app.modules.tasks.enums import TaskStatus
+from app.modules.tasks.crud import TaskCrud
+from app.modules.tasks.events import task_events
+from app.modules.tasks.reminders import ReminderScheduler, InMemoryNotifier
+
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+@pytest_asyncio.fixture
+async def scheduler(test_engine):
+    scheduler = ReminderScheduler(
+        async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False),
+        InMemoryNotifier(), task_events,
+        lead=timedelta(hours=1), window=timedelta(hours=6), batch_size=2
+    )
+    task_events.add_listener(scheduler.on_event)
+    yield scheduler
+    await scheduler.stop()
+
+
+async def add_tasks(db_session, user, *tasks):
+    db_session.add_all(tasks)
+    for task in tasks:
+        task.user = user
+    await db_session.commit()
+    return tasks
+
+
+async def test_reminders_loaded_in_window(scheduler, test_user_without_tasks, db_session):
+    soon, later, far, done, deleted = await add_tasks(
+        db_session, test_user_without_tasks,
+        Task(title="soon", due_date=NOW + timedelta(minutes=30)),
+        Task(title="later", due_date=NOW + timedelta(hours=3)),
+        Task(title="far", due_date=NOW + timedelta(hours=10)),
+        Task(title="done", due_date=NOW + timedelta(minutes=30), status=TaskStatus.COMPLETED),
+        Task(title="deleted", due_date=NOW + timedelta(minutes=30), is_active=False),
+    )
+
+    await scheduler.tick(NOW)
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [soon.id]
+    assert set(scheduler.scheduled) == {later.id}
+
+    await scheduler.tick(NOW + timedelta(hours=2, seconds=1))
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [soon.id, later.id]
+
+    # Окно сдвинулось: задача с дальним сроком загружена без повторного чтения уже загруженных
+    await scheduler.tick(NOW + timedelta(hours=9, seconds=1))
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [soon.id, later.id, far.id]
+    assert scheduler.seconds_until_next(NOW + timedelta(hours=9, seconds=1)) > 0
+
+
+async def test_reminders_follow_task_changes(scheduler, test_user_without_tasks, db_session):
+    task, other = await add_tasks(
+        db_session, test_user_without_tasks,
+        Task(title="task", due_date=NOW + timedelta(hours=3)),
+        Task(title="other", due_date=NOW + timedelta(hours=4)),
+    )
+    await scheduler.tick(NOW)
+    assert set(scheduler.scheduled) == {task.id, other.id}
+
+    task_crud = TaskCrud(db_session)
+    await task_crud.update_user_task(
+        task.id, test_user_without_tasks.id, {"due_date": NOW + timedelta(minutes=20)}
+    )
+    await task_crud.delete_user_task(other.id, test_user_without_tasks.id)
+    assert scheduler.pending_ids == {task.id, other.id}
+
+    await scheduler.tick(NOW)
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [task.id]
+    assert scheduler.scheduled == {}
+
+    # Повторное изменение без смены срока не приводит к повторному напоминанию
+    await task_crud.update_user_task(task.id, test_user_without_tasks.id, {"title": "new title"})
+    await scheduler.tick(NOW)
+    assert len(scheduler.notifier.sent) == 1
+
+
+async def test_reminder_scheduler_loop(scheduler, test_user_without_tasks, db_session):
+    # Планировщик работает с тем же соединением тестовой БД: незафиксированный пользователь пропал бы при откате
+    await db_session.commit()
+    await scheduler.start()
+    await asyncio.sleep(0.05)
+    assert scheduler.notifier.sent == []
+
+    new_task = await TaskCrud(db_session).create_task(
+        TaskIn(title="soon", due_date=datetime.now(timezone.utc) + timedelta(minutes=5)),
+        test_user_without_tasks.id
+    )
+    for _ in range(50):
+        if scheduler.notifier.sent:
+            break
+        await asyncio.sleep(0.01)
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [new_task.id]
+
+
+async def test_reminders_rebuilt_after_event_loss(scheduler, test_user_without_tasks, db_session):
+    task, = await add_tasks(
+        db_session, test_user_without_tasks, Task(title="task", due_date=NOW + timedelta(hours=3))
+    )
+    await scheduler.tick(NOW)
+    assert set(scheduler.scheduled) == {task.id}
+
+    # Изменение без события (уведомление потеряно при разрыве соединения транспорта)
+    task.is_active = False
+    await db_session.commit()
+    task_events.reset()
+    await scheduler.tick(NOW)
+    assert scheduler.scheduled == {}
+
+
+class SwitchLock:
+    def __init__(self):
+        self.granted = False
+
+    async def acquire(self) -> bool:
+        return self.granted
+
+    async def release(self) -> None:
+        self.granted = False
+
+
+async def test_reminders_sent_only_by_leader(scheduler, test_user_without_tasks, db_session):
+    scheduler.lock = SwitchLock()
+    scheduler.leader_retry = 0.01
+    await scheduler.start()
+    task, = await add_tasks(
+        db_session, test_user_without_tasks, Task(title="soon", due_date=NOW + timedelta(minutes=5))
+    )
+    await asyncio.sleep(0.05)
+    assert scheduler.leading is False
+    assert scheduler.notifier.sent == []
+
+    scheduler.lock.granted = True
+    for _ in range(50):
+        if scheduler.notifier.sent:
+            break
+        await asyncio.sleep(0.01)
+    assert scheduler.leading is True
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [task.id]
+
+
+async def test_reminders_recheck_tasks_before_sending(scheduler, test_user_without_tasks, db_session):
+    kept, deleted, done, moved = await add_tasks(
+        db_session, test_user_without_tasks,
+        *(Task(title=title, due_date=NOW + timedelta(hours=2)) for title in ("kept", "deleted", "done", "moved"))
+    )
+    await scheduler.tick(NOW)
+    assert set(scheduler.scheduled) == {kept.id, deleted.id, done.id, moved.id}
+
+    # Изменения другого процесса без событий (транспорт memory)
+    deleted.is_active = False
+    done.status = TaskStatus.COMPLETED
+    moved.due_date = NOW + timedelta(hours=4)
+    await db_session.commit()
+
+    await scheduler.tick(NOW + timedelta(hours=1, seconds=1))
+    assert [reminder.task_id for reminder in scheduler.notifier.sent] == [kept.id]
+    assert set(scheduler.scheduled) == {moved.id}
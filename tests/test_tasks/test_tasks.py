@@ -1,14 +1,34 @@
-from sqlalchemy import select
+import asyncio
+import csv
+import io
+import json
+import pytest
+from sqlalchemy import select, update
 from datetime import datetime, timedelta
 
 from app.modules.tasks.models import Task
+from app.modules.users.models import User
+from app.modules.tasks.schemas import TaskOut
+from app.modules.tasks.enums import TaskPriority, TaskStatus, ExportFormat
+from app.modules.tasks.crud import TaskCrud
+from app.modules.tasks.importer import import_tasks, RecordTooLarge
+from app.core import auth
+from app.core.config import TASK_BATCH_MAX_SIZE, TASK_IMPORT_MAX_RECORD_SIZE
+from app.core.cache import principal_cache
+from app.modules.tasks.cache import task_cache, TaskReadCache
+from app.modules.tasks.events import task_events
+from app.core.cache import MemoryCacheBackend
+from app.core.revocation import revocation_list, auth_events
 
 
 async def test_get_user_tasks_with_tasks(
         authenticated_client_with_tasks,
-        test_user_with_tasks
+        test_user_with_tasks,
+        query_budget
 ):
-    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    # Пользователь, водяной знак для ETag и страница задач
+    with query_budget(3):
+        res = await authenticated_client_with_tasks.get("/api/tasks/")
     assert res.status_code == 200
     tasks = res.json()
     assert len(tasks) == 2
@@ -29,7 +49,8 @@ async def test_get_user_tasks_without_tasks(
 async def test_get_task(
         authenticated_client_with_tasks,
         test_user_with_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -38,9 +59,10 @@ async def test_get_task(
     task = (await db_session.scalars(query)).first()
     assert task is not None
 
-    res = await authenticated_client_with_tasks.get(
-        f"/api/tasks/{task.id}"
-    )
+    with query_budget(2):
+        res = await authenticated_client_with_tasks.get(
+            f"/api/tasks/{task.id}"
+        )
     assert res.status_code == 200
     task_check = res.json()
     assert task_check["id"] == task.id
@@ -76,7 +98,8 @@ async def test_get_task_not_owner(
 async def test_create_task(
         authenticated_client_without_tasks,
         test_user_without_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -85,12 +108,13 @@ async def test_create_task(
     user_tasks = (await db_session.scalars(query)).all()
     assert len(user_tasks) == 0
 
-    res = await authenticated_client_without_tasks.post(
-        "/api/tasks/",
-        json={
-            "title": "New Task"
-        }
-    )
+    with query_budget(3):
+        res = await authenticated_client_without_tasks.post(
+            "/api/tasks/",
+            json={
+                "title": "New Task"
+            }
+        )
     assert res.status_code == 201
     new_task = res.json()
     assert new_task["title"] == "New Task"
@@ -106,7 +130,8 @@ async def test_create_task(
 async def test_update_task(
         authenticated_client_with_tasks,
         test_user_with_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -120,16 +145,18 @@ async def test_update_task(
     old_status = user_task.status.value
     old_priority = user_task.priority.value
 
-    res = await authenticated_client_with_tasks.patch(
-        f"/api/tasks/{user_task.id}",
-        json={
-            "title": "new title",
-            "description": "new description",
-            "status": "completed",
-            "priority": "low",
-            "due_date": f"{datetime.now() + timedelta(days=10)}"
-        }
-    )
+    # Пользователь и UPDATE ... RETURNING без повторного чтения задачи
+    with query_budget(3):
+        res = await authenticated_client_with_tasks.patch(
+            f"/api/tasks/{user_task.id}",
+            json={
+                "title": "new title",
+                "description": "new description",
+                "status": "completed",
+                "priority": "low",
+                "due_date": f"{datetime.now() + timedelta(days=10)}"
+            }
+        )
     assert res.status_code == 200
     updated_task = res.json()
     assert updated_task["id"] == user_task.id
@@ -146,7 +173,8 @@ async def test_update_task_not_owner(
         authenticated_client_without_tasks,
         test_user_with_tasks,
         test_user_without_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -156,14 +184,46 @@ async def test_update_task_not_owner(
     assert user_task is not None
     assert user_task.user_id != test_user_without_tasks.id
 
-    res = await authenticated_client_without_tasks.patch(
-        f"/api/tasks/{user_task.id}",
+    with query_budget(4):
+        res = await authenticated_client_without_tasks.patch(
+            f"/api/tasks/{user_task.id}",
+            json={
+                "description": "new description"
+            }
+        )
+    assert res.status_code == 403
+    assert res.json()["detail"] == "Только владелец может изменить задачу"
+
+
+async def test_update_wrong_task(authenticated_client_with_tasks):
+    res = await authenticated_client_with_tasks.patch(
+        "/api/tasks/1000",
         json={
             "description": "new description"
         }
     )
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Активная задача с ID: 1000 не найдена"
+
+
+async def test_rejected_write_keeps_change_seq(
+        authenticated_client_without_tasks,
+        test_user_with_tasks,
+        test_user_without_tasks,
+        db_session
+):
+    user_task = (await db_session.scalars(select(Task).where(Task.user_id == test_user_with_tasks.id))).first()
+    seq_query = select(User.task_change_seq).where(User.id.in_([test_user_with_tasks.id, test_user_without_tasks.id]))
+    seqs_before = (await db_session.scalars(seq_query)).all()
+
+    res = await authenticated_client_without_tasks.patch(f"/api/tasks/{user_task.id}", json={"title": "new"})
     assert res.status_code == 403
-    assert res.json()["detail"] == "Только владелец может изменить задачу"
+    res = await authenticated_client_without_tasks.delete(f"/api/tasks/{user_task.id}")
+    assert res.status_code == 403
+    res = await authenticated_client_without_tasks.patch("/api/tasks/1000", json={"title": "new"})
+    assert res.status_code == 404
+
+    assert (await db_session.scalars(seq_query)).all() == seqs_before
 
 
 async def test_update_task_empty_fields(
@@ -189,7 +249,8 @@ async def test_update_task_empty_fields(
 async def test_delete_task(
         authenticated_client_with_tasks,
         test_user_with_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -199,9 +260,10 @@ async def test_delete_task(
     assert user_task is not None
     assert user_task.is_active is True
 
-    res = await authenticated_client_with_tasks.delete(
-        f"/api/tasks/{user_task.id}"
-    )
+    with query_budget(3):
+        res = await authenticated_client_with_tasks.delete(
+            f"/api/tasks/{user_task.id}"
+        )
     assert res.status_code == 204
     assert user_task.is_active is False
 
@@ -221,7 +283,8 @@ async def test_delete_wrong_task(
 async def test_delete_task_not_owner(
         authenticated_client_without_tasks,
         test_user_with_tasks,
-        db_session
+        db_session,
+        query_budget
 ):
     query = (
         select(Task)
@@ -231,9 +294,657 @@ async def test_delete_task_not_owner(
     assert user_task is not None
     assert user_task.is_active is True
 
-    res = await authenticated_client_without_tasks.delete(
-        f"/api/tasks/{user_task.id}"
-    )
+    with query_budget(4):
+        res = await authenticated_client_without_tasks.delete(
+            f"/api/tasks/{user_task.id}"
+        )
     assert res.status_code == 403
     assert res.json()["detail"] == "Только владелец может удалить задачу"
     assert user_task.is_active is True
+
+
+async def test_principal_cache_hit(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    assert principal_cache.misses == 1
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    assert principal_cache.hits == 1
+    assert principal_cache.misses == 1
+
+
+async def test_principal_cache_invalidated_on_delete_user(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    assert len(principal_cache) == 1
+
+    res = await authenticated_client_with_tasks.delete(f"/api/users/{test_user_with_tasks.id}")
+    assert res.status_code == 204
+    assert len(principal_cache) == 0
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 401
+
+
+async def test_principal_cache_revoked_by_other_worker(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    await db_session.commit()
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    assert len(principal_cache) == 1
+
+    # Пользователь удален другим процессом: в этот процесс приходит только событие отзыва
+    await db_session.execute(update(User).where(User.id == test_user_with_tasks.id).values(is_active=False))
+    await db_session.commit()
+    await auth_events.publish(
+        test_user_with_tasks.id, {"type": "revoke", "revoked_at": int(datetime.now().timestamp())}
+    )
+    assert len(principal_cache) == 0
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 401
+
+
+async def test_stateless_auth_skips_database(client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_STATELESS", True)
+    token = auth.create_access_token({"sub": "ghost@example.com", "id": 999, "is_active": True})
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    res = await client.get("/api/tasks/")
+    assert res.status_code == 200
+    assert res.json() == []
+    assert principal_cache.misses == 0
+
+
+async def test_stateless_auth_revoked_user(client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_STATELESS", True)
+    token = auth.create_access_token({"sub": "ghost@example.com", "id": 999, "is_active": True})
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+    # Токен выпущен в ту же секунду, что и отзыв (iat в JWT - целые секунды)
+    revocation_list.revoke(999)
+    res = await client.get("/api/tasks/")
+    assert res.status_code == 401
+
+    revocation_list.restore(999)
+    res = await client.get("/api/tasks/")
+    assert res.status_code == 200
+
+
+async def test_get_user_tasks_cursor_pagination(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"limit": 1})
+    assert res.status_code == 200
+    assert [task["title"] for task in res.json()] == ["Task_1"]
+    next_cursor = res.headers["X-Next-Cursor"]
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"limit": 1, "cursor": next_cursor})
+    assert res.status_code == 200
+    assert [task["title"] for task in res.json()] == ["Task_2"]
+    assert "X-Next-Cursor" not in res.headers
+
+
+async def test_get_user_tasks_wrong_cursor(authenticated_client_with_tasks):
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"cursor": "wrong"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Некорректный курсор"
+
+
+async def test_get_user_tasks_filter_and_sort(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    db_session.add_all([
+        Task(title="Task_high", priority=TaskPriority.HIGH, status=TaskStatus.COMPLETED, user=test_user_with_tasks),
+        Task(title="Task_low", priority=TaskPriority.LOW, user=test_user_with_tasks),
+    ])
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"status": "completed"})
+    assert res.status_code == 200
+    assert [task["title"] for task in res.json()] == ["Task_high"]
+
+    res = await authenticated_client_with_tasks.get(
+        "/api/tasks/", params={"priority": ["low", "high"], "sort": "-priority"}
+    )
+    assert res.status_code == 200
+    assert [task["title"] for task in res.json()] == ["Task_high", "Task_low"]
+
+
+async def test_get_user_tasks_sort_by_due_date_with_cursor(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    now = datetime.now()
+    db_session.add_all([
+        Task(title="Task_later", due_date=now + timedelta(days=2), user=test_user_with_tasks),
+        Task(title="Task_sooner", due_date=now + timedelta(days=1), user=test_user_with_tasks),
+    ])
+    await db_session.commit()
+
+    titles = []
+    params = {"sort": "due_date", "limit": 1}
+    while True:
+        res = await authenticated_client_with_tasks.get("/api/tasks/", params=params)
+        assert res.status_code == 200
+        titles += [task["title"] for task in res.json()]
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+    assert titles == ["Task_sooner", "Task_later", "Task_1", "Task_2"]
+
+    res = await authenticated_client_with_tasks.get(
+        "/api/tasks/", params={"sort": "priority", "cursor": params["cursor"]}
+    )
+    assert res.status_code == 400
+
+    # С фильтром по сроку задачи без срока исключены, курсор строится без признака их отсутствия
+    params = {"sort": "due_date", "limit": 1, "due_from": now.isoformat()}
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params=params)
+    assert [task["title"] for task in res.json()] == ["Task_sooner"]
+    params["cursor"] = res.headers["X-Next-Cursor"]
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params=params)
+    assert [task["title"] for task in res.json()] == ["Task_later"]
+    assert "X-Next-Cursor" not in res.headers
+
+
+async def test_search_tasks(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    db_session.add_all([
+        Task(title="Купить молоко", description="И хлеб", user=test_user_with_tasks),
+        Task(title="Позвонить", description="Купить билеты", user=test_user_with_tasks),
+        Task(title="Купить подарок", is_active=False, user=test_user_with_tasks),
+    ])
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/search", params={"q": "купить"})
+    assert res.status_code == 200
+    assert sorted(task["title"] for task in res.json()) == ["Купить молоко", "Позвонить"]
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/search", params={"q": "хлеб"})
+    assert [task["title"] for task in res.json()] == ["Купить молоко"]
+
+
+async def test_search_tasks_after_update(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+    res = await authenticated_client_with_tasks.get("/api/tasks/search", params={"q": "Task_1"})
+    task_id = res.json()[0]["id"]
+
+    res = await authenticated_client_with_tasks.patch(f"/api/tasks/{task_id}", json={"title": "Отчет"})
+    assert res.status_code == 200
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/search", params={"q": "Task_1"})
+    assert res.json() == []
+    res = await authenticated_client_with_tasks.get("/api/tasks/search", params={"q": "отчет"})
+    assert [task["id"] for task in res.json()] == [task_id]
+
+
+async def test_create_tasks_batch(
+        authenticated_client_without_tasks,
+        test_user_without_tasks,
+        db_session
+):
+    res = await authenticated_client_without_tasks.post(
+        "/api/tasks/batch",
+        json=[{"title": "Batch_1"}, {"title": ""}, {"title": "Batch_2", "priority": "high"}]
+    )
+    assert res.status_code == 201
+    batch = res.json()
+    assert batch["created"] == 2
+    assert batch["failed"] == 1
+    assert [item["index"] for item in batch["results"]] == [0, 1, 2]
+    assert batch["results"][0]["task"]["title"] == "Batch_1"
+    assert batch["results"][1]["errors"][0]["loc"] == ["title"]
+    assert batch["results"][2]["task"]["priority"] == "high"
+
+    query = (
+        select(Task)
+        .where(Task.user_id == test_user_without_tasks.id)
+    )
+    user_tasks = (await db_session.scalars(query)).all()
+    assert sorted(task.title for task in user_tasks) == ["Batch_1", "Batch_2"]
+
+
+async def test_create_tasks_batch_strict(authenticated_client_without_tasks):
+    res = await authenticated_client_without_tasks.post(
+        "/api/tasks/batch",
+        params={"strict": True},
+        json=[{"title": "Batch_1"}, {"priority": "high"}]
+    )
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["index"] == 1
+
+
+async def test_bulk_update_tasks(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        test_user_without_tasks,
+        db_session
+):
+    foreign_task = Task(title="Foreign", user=test_user_without_tasks)
+    db_session.add(foreign_task)
+    await db_session.commit()
+    user_tasks = (await db_session.scalars(select(Task).where(Task.user_id == test_user_with_tasks.id))).all()
+
+    res = await authenticated_client_with_tasks.patch(
+        "/api/tasks/bulk",
+        json={
+            "ids": [task.id for task in user_tasks] + [foreign_task.id],
+            "changes": {"status": "completed"}
+        }
+    )
+    assert res.status_code == 200
+    assert res.json()["affected"] == 2
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"status": "completed"})
+    assert len(res.json()) == 2
+    assert (await db_session.get(Task, foreign_task.id)).status == TaskStatus.PENDING
+
+
+async def test_bulk_delete_tasks_by_filter(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.post(
+        "/api/tasks/bulk/delete",
+        json={"filter": {"status": ["pending"]}}
+    )
+    assert res.status_code == 200
+    assert res.json()["affected"] == 2
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.json() == []
+
+
+async def test_bulk_delete_tasks_without_selection(authenticated_client_with_tasks):
+    res = await authenticated_client_with_tasks.post("/api/tasks/bulk/delete", json={})
+    assert res.status_code == 422
+
+
+async def test_bulk_tasks_empty_filter(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    for body in ({"filter": {}}, {"filter": {"status": [], "overdue": False}}):
+        res = await authenticated_client_with_tasks.post("/api/tasks/bulk/delete", json=body)
+        assert res.status_code == 422
+        res = await authenticated_client_with_tasks.patch("/api/tasks/bulk", json={**body, "changes": {"title": "x"}})
+        assert res.status_code == 422
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert [task["title"] for task in res.json()] == ["Task_1", "Task_2"]
+
+
+async def test_bulk_tasks_too_many_ids(authenticated_client_with_tasks):
+    ids = list(range(1, TASK_BATCH_MAX_SIZE + 2))
+    res = await authenticated_client_with_tasks.post("/api/tasks/bulk/delete", json={"ids": ids})
+    assert res.status_code == 422
+
+
+async def test_update_task_null_fields(authenticated_client_with_tasks, test_user_with_tasks, db_session):
+    user_task = (await db_session.scalars(select(Task).where(Task.user_id == test_user_with_tasks.id))).first()
+    await db_session.commit()
+
+    for field in ("title", "status", "priority"):
+        res = await authenticated_client_with_tasks.patch(f"/api/tasks/{user_task.id}", json={field: None})
+        assert res.status_code == 422
+        res = await authenticated_client_with_tasks.patch("/api/tasks/bulk", json={"ids": [user_task.id], "changes": {field: None}})
+        assert res.status_code == 422
+
+    res = await authenticated_client_with_tasks.patch(f"/api/tasks/{user_task.id}", json={"description": None})
+    assert res.status_code == 200
+
+
+async def test_export_tasks_ndjson(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    db_session.add(Task(title="Deleted", is_active=False, user=test_user_with_tasks))
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/export")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Task_1", "Task_2"]
+    assert rows[0]["status"] == "pending"
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/export", params={"include_inactive": True})
+    assert [json.loads(line)["title"] for line in res.text.splitlines()] == ["Task_1", "Task_2", "Deleted"]
+
+
+async def test_export_tasks_csv(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/export", params={"format": "csv"})
+    assert res.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [row["title"] for row in rows] == ["Task_1", "Task_2"]
+    assert rows[0]["priority"] == "medium"
+
+
+async def test_import_tasks_ndjson(
+        authenticated_client_without_tasks,
+        test_user_without_tasks,
+        db_session
+):
+    await db_session.commit()
+    body = "\n".join([
+        json.dumps({"title": "Imported_1", "priority": "high"}),
+        "not json",
+        json.dumps({"description": "без заголовка"}),
+        json.dumps({"title": "Imported_2"}),
+    ])
+
+    res = await authenticated_client_without_tasks.post("/api/tasks/import", content=body.encode())
+    assert res.status_code == 200
+    report = res.json()
+    assert report["processed"] == 4
+    assert report["imported"] == 2
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [2, 3]
+
+    res = await authenticated_client_without_tasks.get("/api/tasks/")
+    assert [(task["title"], task["priority"]) for task in res.json()] == [("Imported_1", "high"), ("Imported_2", "medium")]
+
+
+async def test_import_tasks_csv_in_chunks(test_user_without_tasks, db_session):
+    body = 'title,description,priority\nA,,low\n"B","многострочное\nописание",high\nC,,wrong\nD,"с ""кавычками""",\n'
+
+    async def chunks():
+        for i in range(0, len(body.encode()), 7):
+            yield body.encode()[i:i + 7]
+
+    progress = []
+    report = await import_tasks(
+        TaskCrud(db_session), test_user_without_tasks.id, chunks(), ExportFormat.CSV,
+        chunk_size=2, progress=lambda report: progress.append(report.imported)
+    )
+    assert (report.processed, report.imported, report.failed) == (4, 3, 1)
+    assert report.errors[0].line == 5
+    assert progress == [2, 3]
+
+    user_tasks = (await db_session.scalars(select(Task).where(Task.user_id == test_user_without_tasks.id))).all()
+    assert {task.title: task.description for task in user_tasks} == {
+        "A": None, "B": "многострочное\nописание", "D": 'с "кавычками"'
+    }
+
+
+async def test_import_tasks_record_too_large(
+        authenticated_client_without_tasks,
+        test_user_without_tasks,
+        db_session
+):
+    await db_session.commit()
+    body = 'title,description\nA,"' + "x\n" * (TASK_IMPORT_MAX_RECORD_SIZE // 2 + 1)
+
+    res = await authenticated_client_without_tasks.post(
+        "/api/tasks/import", params={"format": "csv"}, content=body.encode()
+    )
+    assert res.status_code == 422
+    assert res.json()["detail"] == f"Запись в строке 2 превышает {TASK_IMPORT_MAX_RECORD_SIZE} символов"
+
+    async def chunks():
+        yield b'{"title": "A"}\n'
+        for _ in range(10):
+            yield b"y" * 10
+
+    with pytest.raises(RecordTooLarge) as e:
+        await import_tasks(
+            TaskCrud(db_session), test_user_without_tasks.id, chunks(), ExportFormat.NDJSON, max_record_size=50
+        )
+    assert e.value.line == 2
+
+
+async def test_get_user_tasks_matches_task_out(
+        authenticated_client_with_tasks,
+        test_user_with_tasks,
+        db_session
+):
+    db_session.add(Task(
+        title="Overdue", description="Описание", priority=TaskPriority.HIGH,
+        due_date=datetime.now() - timedelta(days=1), user=test_user_with_tasks
+    ))
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    user_tasks = (await db_session.scalars(
+        select(Task).where(Task.user_id == test_user_with_tasks.id).order_by(Task.id)
+    )).all()
+    assert res.json() == [TaskOut.model_validate(task).model_dump(mode="json") for task in user_tasks]
+
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{user_tasks[-1].id}")
+    assert res.status_code == 200
+    assert res.json()["title"] == "Overdue"
+
+
+async def test_get_user_tasks_fields(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"fields": "title,status"})
+    assert res.status_code == 200
+    assert [set(task) for task in res.json()] == [{"id", "title", "status"}] * 2
+
+    task_id = res.json()[0]["id"]
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}", params={"fields": "due_date"})
+    assert res.status_code == 200
+    assert res.json() == {"id": task_id, "due_date": None}
+
+
+async def test_sparse_task_responses_documented(client):
+    res = await client.get("/openapi.json")
+    schemas = res.json()["components"]["schemas"]
+    assert schemas["TaskPartialOut"]["required"] == ["id"]
+
+    paths = res.json()["paths"]
+    list_schema = paths["/api/tasks/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert list_schema["items"]["$ref"] == "#/components/schemas/TaskPartialOut"
+    detail_schema = paths["/api/tasks/{task_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert detail_schema["$ref"] == "#/components/schemas/TaskPartialOut"
+
+
+async def test_get_user_tasks_wrong_fields(authenticated_client_with_tasks):
+    res = await authenticated_client_with_tasks.get("/api/tasks/", params={"fields": "title,password"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Неизвестные поля: password"
+
+
+async def test_get_user_tasks_etag(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    res = await authenticated_client_with_tasks.get(
+        "/api/tasks/", params={"fields": "title"}, headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 200
+
+    task_id = res.json()[0]["id"]
+    res = await authenticated_client_with_tasks.delete(f"/api/tasks/{task_id}")
+    assert res.status_code == 204
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert len(res.json()) == 1
+
+
+async def test_get_task_etag(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+    task_id = (await authenticated_client_with_tasks.get("/api/tasks/")).json()[0]["id"]
+
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}")
+    etag = res.headers["ETag"]
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}", headers={"If-None-Match": f"W/{etag}"})
+    assert res.status_code == 304
+
+    res = await authenticated_client_with_tasks.patch(f"/api/tasks/{task_id}", json={"title": "new title"})
+    assert res.status_code == 200
+
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["title"] == "new title"
+
+
+async def test_task_cache_hit(authenticated_client_with_tasks, db_session, query_budget):
+    await db_session.commit()
+
+    first = await authenticated_client_with_tasks.get("/api/tasks/")
+    misses = task_cache.stats()["misses"]
+    with query_budget(0):
+        second = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert second.json() == first.json()
+
+    stats = task_cache.stats()
+    assert stats["misses"] == misses
+    assert stats["hits"] >= 2
+    assert stats["bytes"] > 0
+
+    task_id = first.json()[0]["id"]
+    await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}")
+    hits = task_cache.stats()["hits"]
+    await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}")
+    assert task_cache.stats()["hits"] == hits + 1
+
+
+async def test_task_cache_skips_row_changed_during_load():
+    cache = TaskReadCache(MemoryCacheBackend(maxsize=100, ttl=60, maxbytes=10000))
+    loads = []
+
+    async def load_stale():
+        # Изменение задачи фиксируется, пока строка читается
+        loads.append(1)
+        await cache.invalidate_user(1)
+        return {"id": 5, "user_id": 1, "title": "old"}
+
+    assert (await cache.get_task_value(5, None, load_stale))["title"] == "old"
+
+    async def load_fresh():
+        loads.append(1)
+        return {"id": 5, "user_id": 1, "title": "new"}
+
+    # Устаревшая строка не сохранена: следующее чтение загружает задачу заново
+    assert (await cache.get_task_value(5, None, load_fresh))["title"] == "new"
+    assert (await cache.get_task_value(5, None, load_fresh))["title"] == "new"
+    assert len(loads) == 2
+
+
+async def test_task_cache_invalidated_by_other_worker(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+    first = await authenticated_client_with_tasks.get("/api/tasks/")
+    etag = first.headers["ETag"]
+    task_id = first.json()[0]["id"]
+
+    # Задача изменена другим процессом: сюда приходит только событие
+    await db_session.execute(update(Task).where(Task.id == task_id).values(title="changed", change_seq=100))
+    await db_session.commit()
+    await task_events.publish(first.json()[0]["user_id"], {"type": "updated", "task_ids": [task_id]})
+    await asyncio.sleep(0)
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()[0]["title"] == "changed"
+
+
+async def test_memory_cache_byte_budget():
+    backend = MemoryCacheBackend(maxsize=100, ttl=60, maxbytes=1000, max_entry_bytes=400)
+    for key in range(5):
+        await backend.set(key, "x" * 200)
+    stats = backend.stats()
+    assert stats["bytes"] <= 1000
+    # Вытеснены самые давно использованные записи
+    assert await backend.get(0) is None
+    assert await backend.get(4) == "x" * 200
+
+    await backend.set("big", "x" * 500)
+    assert await backend.get("big") is None
+    assert backend.stats()["bytes"] == stats["bytes"]
+
+    # Изменение полученного значения не затрагивает запись в кеше
+    await backend.set("rows", [{"title": "Task_1"}])
+    (await backend.get("rows"))[0]["title"] = "changed"
+    assert await backend.get("rows") == [{"title": "Task_1"}]
+
+
+async def test_task_cache_invalidated_on_write(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+    tasks = (await authenticated_client_with_tasks.get("/api/tasks/")).json()
+    task_id = tasks[0]["id"]
+    await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}")
+
+    res = await authenticated_client_with_tasks.patch(f"/api/tasks/{task_id}", json={"title": "new title"})
+    assert res.status_code == 200
+    res = await authenticated_client_with_tasks.get(f"/api/tasks/{task_id}")
+    assert res.json()["title"] == "new title"
+
+    res = await authenticated_client_with_tasks.post("/api/tasks/", json={"title": "Task_3"})
+    assert res.status_code == 201
+    res = await authenticated_client_with_tasks.get("/api/tasks/")
+    assert [task["title"] for task in res.json()] == ["new title", "Task_2", "Task_3"]
+
+
+async def test_get_task_changes(authenticated_client_with_tasks, db_session):
+    await db_session.commit()
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes", params={"limit": 1})
+    assert res.status_code == 200
+    page = res.json()
+    assert [task["title"] for task in page["tasks"]] == ["Task_1"]
+    assert page["has_more"] is True
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes", params={"since": page["cursor"]})
+    page = res.json()
+    assert [task["title"] for task in page["tasks"]] == ["Task_2"]
+    assert page["has_more"] is False
+    cursor = page["cursor"]
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes", params={"since": cursor})
+    assert res.json() == {"tasks": [], "cursor": cursor, "has_more": False}
+
+    task_1_id = (await authenticated_client_with_tasks.get("/api/tasks/")).json()[0]["id"]
+    await authenticated_client_with_tasks.delete(f"/api/tasks/{task_1_id}")
+    await authenticated_client_with_tasks.post("/api/tasks/", json={"title": "Task_3"})
+
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes", params={"since": cursor})
+    tasks = res.json()["tasks"]
+    assert [(task["title"], task["is_active"]) for task in tasks] == [("Task_1", False), ("Task_3", True)]
+    assert tasks[0]["updated_at"] is not None
+
+
+async def test_get_task_changes_wrong_cursor(authenticated_client_with_tasks):
+    res = await authenticated_client_with_tasks.get("/api/tasks/changes", params={"since": "garbage"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Некорректный курсор"
+
+
+async def test_delete_task_bumps_updated_at(test_user_with_tasks, db_session):
+    task = (await db_session.scalars(select(Task).where(Task.user_id == test_user_with_tasks.id))).first()
+    assert task.updated_at is None
+    await TaskCrud(db_session).delete_task(task.id)
+    await db_session.refresh(task)
+    assert task.is_active is False
+    assert task.updated_at is not None
@@ -1,11 +1,20 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import datetime, timedelta
 
-from app.modules.users.models import User
+from app.modules.users.models import User, UserJob
+from app.modules.users.crud import UserCrud
+from app.modules.users.enums import UserJobStatus
 from app.modules.tasks.models import Task
+from app.modules.users.revocations import load_revocations
+from app.core.security import password_hasher
+from app.core.revocation import revocation_list, auth_events, revoke_user_tokens, restore_user_tokens
+from app.core.config import USER_JOB_MAX_ATTEMPTS
 
 
-async def test_get_user(client, test_user_without_tasks):
-    res = await client.get("/api/users/1")
+async def test_get_user(client, test_user_without_tasks, query_budget):
+    with query_budget(1):
+        res = await client.get("/api/users/1")
     assert res.status_code == 200
     user = res.json()
     assert user["id"] == 1
@@ -22,15 +31,17 @@ async def test_get_wrong_user(client):
     assert res.json()["detail"] == "Активный пользователь с ID: 1 не найден"
 
 
-async def test_create_user(client, db_session):
-    res = await client.post(
-        "/api/users/",
-        json={
-            "name": "User_3",
-            "email": "user_3@example.com",
-            "password": "12345678"
-        }
-    )
+async def test_create_user(client, db_session, query_budget):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING без предварительной проверки почты
+    with query_budget(1):
+        res = await client.post(
+            "/api/users/",
+            json={
+                "name": "User_3",
+                "email": "user_3@example.com",
+                "password": "12345678"
+            }
+        )
     assert res.status_code == 201
     new_user = res.json()
     assert new_user["name"] == "User_3"
@@ -75,12 +86,24 @@ async def test_delete_user(client, db_session, test_user_with_tasks):
     res = await client.delete("/api/users/1")
     assert res.status_code == 204
     assert test_user_with_tasks.is_active is False
+
+    # Задачи деактивируются фоновым заданием после ответа
+    user_tasks = (await db_session.scalars(query.execution_options(populate_existing=True))).all()
+    assert len(user_tasks) == 2
     for task in user_tasks:
         assert task.is_active is False
 
+    res = await client.get(res.headers["Location"])
+    assert res.status_code == 200
+    job = res.json()
+    assert job["action"] == "deactivate_tasks"
+    assert job["status"] == "completed"
+    assert job["processed"] == 2
+
 
 async def test_restore_user(client, test_deleted_user):
     assert test_deleted_user.is_active is False
+    revocation_list.revoke(test_deleted_user.id)
 
     res = await client.patch("/api/users/restore/1")
     assert res.status_code == 200
@@ -88,16 +111,134 @@ async def test_restore_user(client, test_deleted_user):
     assert user["name"] == "User_1"
     assert user["is_active"] is True
     assert user["updated_at"] is not None
+    assert not revocation_list.is_revoked(test_deleted_user.id, datetime.now().timestamp())
 
 
-async def test_login(client, test_user_without_tasks):
-    res = await client.post(
-        "/api/users/token",
-        data={
-            "username": test_user_without_tasks.email,
-            "password": "12345678"
-        }
+async def test_revocation_events():
+    # События другого процесса применяются через auth_events
+    await auth_events.publish(5, {"type": "revoke", "revoked_at": int(datetime.now().timestamp())})
+    assert revocation_list.is_revoked(5, None)
+    await auth_events.publish(5, {"type": "restore"})
+    assert len(revocation_list) == 0
+
+    await revoke_user_tokens(5)
+    assert revocation_list.is_revoked(5, datetime.now().timestamp())
+    await restore_user_tokens(5)
+    assert not revocation_list.is_revoked(5, datetime.now().timestamp())
+
+
+async def test_load_revocations(test_engine, db_session):
+    now = datetime.now()
+    db_session.add_all([
+        User(id=1, name="deleted", email="deleted@example.com", hashed_password="x", is_active=False, updated_at=now),
+        User(
+            id=2, name="long_ago", email="long_ago@example.com", hashed_password="x", is_active=False,
+            updated_at=now - timedelta(seconds=revocation_list.ttl_seconds + 60)
+        ),
+        User(id=3, name="active", email="active@example.com", hashed_password="x", updated_at=now),
+    ])
+    await db_session.commit()
+    revocation_list.revoke(3)
+
+    await load_revocations(async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False))
+    # Список заменен данными базы: отозваны только недавно удаленные пользователи
+    assert len(revocation_list) == 1
+    assert revocation_list.is_revoked(1, int(now.timestamp()))
+    assert not revocation_list.is_revoked(1, int(now.timestamp()) + 1)
+
+
+async def test_user_cascade_in_chunks(db_session, test_user_with_tasks):
+    user_id = test_user_with_tasks.id
+    db_session.add_all([Task(title=f"Task_{i}", user_id=user_id) for i in range(3, 6)])
+    db_session.add(Task(
+        title="Deleted", user_id=user_id, is_active=False, updated_at=datetime.now() - timedelta(days=1)
+    ))
+    await db_session.commit()
+    query = select(Task.title).where(Task.user_id == user_id, Task.is_active.is_(True)).order_by(Task.id)
+    user_crud = UserCrud(db_session)
+
+    job = await user_crud.delete_user(user_id)
+    assert job.status == UserJobStatus.PENDING
+    assert len((await db_session.scalars(query)).all()) == 5
+
+    await user_crud.run_job(job.id, chunk_size=2)
+    job = await user_crud.get_job(job.id)
+    assert job.status == UserJobStatus.COMPLETED
+    assert job.processed == 5
+    assert job.last_task_id == job.max_task_id
+    assert (await db_session.scalars(query)).all() == []
+
+    _, job = await user_crud.restore_user(user_id)
+    await user_crud.run_job(job.id, chunk_size=2)
+    job = await user_crud.get_job(job.id)
+    assert job.status == UserJobStatus.COMPLETED
+    assert job.processed == 5
+    # Задача, удаленная до удаления пользователя, не восстанавливается
+    assert (await db_session.scalars(query)).all() == [f"Task_{i}" for i in range(1, 6)]
+
+
+async def test_user_cascade_resume_and_cancel(db_session, test_user_with_tasks):
+    await db_session.commit()
+    user_crud = UserCrud(db_session)
+
+    delete_job = await user_crud.delete_user(test_user_with_tasks.id)
+    assert await user_crud.get_unfinished_job_ids() == [delete_job.id]
+
+    _, restore_job = await user_crud.restore_user(test_user_with_tasks.id)
+    assert (await user_crud.get_job(delete_job.id)).status == UserJobStatus.CANCELLED
+    assert await user_crud.get_unfinished_job_ids() == [restore_job.id]
+
+    await user_crud.run_job(delete_job.id)
+    await user_crud.run_job(restore_job.id)
+    assert (await user_crud.get_job(delete_job.id)).processed == 0
+    assert await user_crud.get_unfinished_job_ids() == []
+    tasks = (await db_session.scalars(select(Task).where(Task.user_id == test_user_with_tasks.id))).all()
+    assert all(task.is_active for task in tasks)
+
+
+async def test_user_job_claim(db_session, test_user_with_tasks):
+    await db_session.commit()
+    user_crud = UserCrud(db_session)
+    job = await user_crud.delete_user(test_user_with_tasks.id)
+
+    assert (await user_crud.claim_job(job.id, "first")).owner == "first"
+    # Задание уже выполняет другой процесс
+    assert await user_crud.claim_job(job.id, "second") is None
+    await user_crud.run_job(job.id)
+    assert (await user_crud.get_job(job.id)).processed == 0
+
+    # Процесс-исполнитель пропал: после устаревания heartbeat задание захватывает другой процесс
+    claimed = await user_crud.claim_job(job.id, "second", stale_after=timedelta(0))
+    assert claimed.owner == "second"
+    assert claimed.attempts == 2
+    assert await user_crud._update_job(job.id, "first", processed=100) is False
+    await db_session.commit()
+
+    # Исчерпавшее попытки задание больше не запускается
+    await db_session.execute(
+        update(UserJob)
+        .where(UserJob.id == job.id)
+        .values(status=UserJobStatus.FAILED, attempts=USER_JOB_MAX_ATTEMPTS)
     )
+    await db_session.commit()
+    assert await user_crud.get_unfinished_job_ids() == []
+    assert await user_crud.claim_job(job.id, "third") is None
+
+
+async def test_get_wrong_user_job(client):
+    res = await client.get("/api/users/jobs/1")
+    assert res.status_code == 404
+
+
+async def test_login(client, test_user_without_tasks, query_budget):
+    with query_budget(1):
+        res = await client.post(
+            "/api/users/token",
+            data={
+                "username": test_user_without_tasks.email,
+                "password": "12345678"
+            }
+        )
     assert res.status_code == 200
     dct = res.json()
     assert dct["access_token"] is not None
@@ -114,3 +255,32 @@ async def test_login_with_wrong_password(client, test_user_without_tasks):
     )
     assert res.status_code == 401
     assert res.json()["detail"] == 'Неверный адрес электронной почты или пароль'
+
+
+async def test_login_hasher_saturated(client, test_user_without_tasks, monkeypatch):
+    monkeypatch.setattr(password_hasher, "queue_size", 0)
+    res = await client.post(
+        "/api/users/token",
+        data={
+            "username": test_user_without_tasks.email,
+            "password": "12345678"
+        }
+    )
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+async def test_login_hasher_metrics(client, test_user_without_tasks):
+    calls = password_hasher.stats()["calls"]
+    res = await client.post(
+        "/api/users/token",
+        data={
+            "username": test_user_without_tasks.email,
+            "password": "12345678"
+        }
+    )
+    assert res.status_code == 200
+    stats = password_hasher.stats()
+    assert stats["calls"] == calls + 1
+    assert stats["pending"] == 0
+    assert stats["max_seconds"] > 0